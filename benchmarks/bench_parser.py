@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# Compare the byte-level E record parser used by jobstats with decoding
+# every line through JobRecord (the original Job constructor).  Both build a
+# JobTable from the same files; the tables are checked to be identical
+# before the timings are reported.
+#
+#   python benchmarks/bench_parser.py [-d ./Data] [-r 3]
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.abspath(__file__)),os.pardir))
+from jobstats.ingest import read_accounting_file
+from jobstats.records import JobRecord
+from jobstats.table import JobTable
+
+
+# The import loop JobStats.py used before parse_accounting_data
+def read_with_jobrecord(datafile_name):
+    table = JobTable()
+    datafile = open(datafile_name,"r")
+    offset = 0
+    for line in datafile:
+        if line.find(";") > 0:
+            data = line.split(';')
+            if data[1] == "E":
+                data[3] = data[3].split()
+                current_job = JobRecord(data)
+                if current_job.exit_status == 0 and \
+                   hasattr(current_job,'num_cores'):
+                    table.append(current_job,datafile_name,offset)
+        offset += len(line)
+    datafile.close()
+    table.freeze()
+    return table
+
+
+def count_records(file_names):
+    lines = 0
+    records = 0
+    for datafile_name in file_names:
+        for line in open(datafile_name,"r"):
+            lines += 1
+            if line.split(';',2)[1:2] == ["E"]:
+                records += 1
+    return lines, records
+
+
+def same_tables(a,b):
+    if sorted(a.columns) != sorted(b.columns) or a.files != b.files:
+        return False
+    for column in a.columns:
+        if not (a.columns[column] == b.columns[column]).all():
+            return False
+    if not ((a.host_list == b.host_list).all() and (a.host_cores == b.host_cores).all()):
+        return False
+    return a.names == b.names
+
+
+def best_time(reader,file_names,repeat):
+    best = None
+    for i in range(repeat):
+        start = time.time()
+        tables = [reader(datafile_name) for datafile_name in file_names]
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, tables
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the accounting record parser")
+    parser.add_argument("-d","--data-dir",default="./Data")
+    parser.add_argument("-r","--repeat",type=int,default=3,help="best of this many runs")
+    args = parser.parse_args()
+
+    file_names = sorted([os.path.join(args.data_dir,f) for f in os.listdir(args.data_dir)])
+    lines, records = count_records(file_names)
+    print ("%d files, %d lines, %d E records") % (len(file_names),lines,records)
+
+    results = list()
+    for label, reader in (("JobRecord",read_with_jobrecord),\
+                          ("parse_accounting_data",read_accounting_file)):
+        elapsed, tables = best_time(reader,file_names,args.repeat)
+        results.append((label,elapsed,tables))
+
+    for reference, fast in zip(results[0][2],results[1][2]):
+        if not same_tables(reference,fast):
+            print ("Tables differ for %s") % reference.files
+            sys.exit(1)
+
+    for label, elapsed, tables in results:
+        print ("%-22s %8.3f s %12.0f lines/s %12.0f E records/s") % \
+              (label,elapsed,lines / elapsed,records / elapsed)
+    print ("Speedup: %.1fx") % (results[0][1] / results[1][1])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# Time jobstats on synthetic logs of increasing size.  For every size the
+# logs are written once by generate_logs.py (and reused on later runs), then
+# a fresh process times the three phases of a run:
+#
+#   ingest     load_jobs() over every file, without the cache, and
+#              deduplicate()
+#   aggregate  report_stats() for the default windows
+#   report     print_report() of those sections to /dev/null
+#
+# Each phase reports its time, jobs/s and the peak RSS of the process so
+# far.  Results are appended to a JSON-lines file so that runs on different
+# revisions can be compared; with --baseline the times of an earlier results
+# file are shown alongside.
+#
+#   python benchmarks/bench_scaling.py --sizes 100000,1000000 -w /tmp/bench
+#
+# 10M jobs take about 10 GB of logs and several GB of memory.
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0,os.path.join(here,os.pardir))
+from jobstats.profiling import peak_rss_mb
+
+phases = ('ingest','aggregate','report')
+
+
+# Run the phases on one directory of logs and print the results as JSON
+def run_phases(data_dir,workers):
+    from jobstats.ingest import deduplicate, load_jobs
+    from jobstats.report import print_report, report_stats
+    from jobstats.settings import report_windows
+    results = dict()
+    started = time.time()
+    JobList = deduplicate(load_jobs([os.path.join(data_dir,f) \
+                                     for f in sorted(os.listdir(data_dir))],workers))[0]
+    results['ingest'] = (time.time() - started,peak_rss_mb())
+
+    # Put the rolling windows at the end of the logs
+    now = int(JobList.columns['ctime'].max()) + 1 if len(JobList) > 0 else int(time.time())
+    started = time.time()
+    sections = report_stats(JobList,report_windows(now))
+    results['aggregate'] = (time.time() - started,peak_rss_mb())
+
+    started = time.time()
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull,"w")
+    try:
+        print_report(sections)
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+    results['report'] = (time.time() - started,peak_rss_mb())
+    print (json.dumps({'jobs':len(JobList),'phases':results}))
+
+
+def revision():
+    try:
+        return subprocess.check_output(["git","rev-parse","--short","HEAD"],cwd=here,\
+                                       stderr=open(os.devnull,"w")).strip()
+    except (OSError,subprocess.CalledProcessError):
+        return None
+
+
+# Seconds of every (size, phase) in the newest run of a results file
+def load_baseline(filename):
+    baseline = dict()
+    for line in open(filename):
+        record = json.loads(line)
+        baseline[(record['size'],record['phase'])] = record['seconds']
+    return baseline
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark jobstats on synthetic logs")
+    parser.add_argument("--sizes",default="100000,1000000,10000000",\
+                        help="comma-separated numbers of jobs (default: %(default)s)")
+    parser.add_argument("-w","--work-dir",default="./bench_logs",\
+                        help="where the generated logs are kept (default: %(default)s)")
+    parser.add_argument("-j","--workers",type=int,default=1,\
+                        help="processes used by load_jobs (default: %(default)s)")
+    parser.add_argument("--regenerate",action="store_true",\
+                        help="write the logs again even if they exist")
+    parser.add_argument("-o","--output",default="bench_results.jsonl",\
+                        help="JSON-lines file the results are appended to (default: %(default)s)")
+    parser.add_argument("--baseline",help="results file of an earlier run to compare with")
+    parser.add_argument("--child",help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_phases(args.child,args.workers)
+        return
+
+    baseline = dict()
+    if args.baseline:
+        baseline = load_baseline(args.baseline)
+    rev = revision()
+    output = open(args.output,"a")
+    print ("%10s %-10s %10s %14s %12s %10s") % \
+          ("Jobs","Phase","Seconds","Jobs/s","Peak RSS MB","Baseline")
+    for size in [int(size) for size in args.sizes.split(',')]:
+        data_dir = os.path.join(args.work_dir,"jobs%d" % size)
+        if args.regenerate or not os.path.isdir(data_dir):
+            subprocess.check_call([sys.executable,os.path.join(here,"generate_logs.py"),\
+                                   "-o",data_dir,"-n",str(size),"--force"])
+        result = json.loads(subprocess.check_output([sys.executable,__file__,"--child",data_dir,\
+                                                     "-j",str(args.workers)]).splitlines()[-1])
+        for phase in phases:
+            seconds, rss = result['phases'][phase]
+            record = {'size':size,'jobs':result['jobs'],'phase':phase,'seconds':seconds,\
+                      'jobs_per_second':result['jobs'] / seconds if seconds > 0 else None,\
+                      'peak_rss_mb':rss,'workers':args.workers,'revision':rev,\
+                      'python':platform.python_version(),'time':int(time.time())}
+            output.write(json.dumps(record,sort_keys=True) + "\n")
+            compare = ""
+            if (size,phase) in baseline:
+                compare = "%9.2fx" % (seconds / baseline[(size,phase)])
+            print ("%10d %-10s %10.2f %14.0f %12.1f %10s") % \
+                  (size,phase,seconds,record['jobs_per_second'] or 0,rss,compare)
+            sys.stdout.flush()
+    output.close()
+
+
+if __name__ == "__main__":
+    main()
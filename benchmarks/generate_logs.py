@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+# Write synthetic Torque accounting logs in the format JobStats.py reads:
+# one file per day (YYYYMMDD) of "MM/DD/YYYY HH:MM:SS;type;id.server;..."
+# lines.  Every job gets a Q record when it is submitted, an S record when
+# it starts and an E record when it ends, each in the file of the day it is
+# logged on.  The mix of users, queues, multinode and GPU jobs and the
+# shape of the exec_host lists can be set from the command line, and the
+# same seed always gives the same files.
+#
+#   python benchmarks/generate_logs.py -o /tmp/logs -n 1000000 --days 365
+import argparse
+import os
+import random
+import time
+
+
+
+class LogWriter:
+    def __init__(self,directory):
+        self.directory = directory
+        self.days = dict()
+
+    def add(self,logtime,line):
+        t = time.localtime(logtime)
+        day = (t.tm_year,t.tm_mon,t.tm_mday)
+        lines = self.days.get(day)
+        if lines is None:
+            lines = list()
+            self.days[day] = lines
+        lines.append((logtime,time.strftime("%m/%d/%Y %H:%M:%S",t) + line))
+
+    # Write out every day before the given one; no job submitted from then
+    # on can log anything earlier
+    def flush(self,before=None):
+        for day in sorted(self.days):
+            if before is not None and day >= before:
+                break
+            lines = self.days.pop(day)
+            lines.sort()
+            datafile = open(os.path.join(self.directory,"%04d%02d%02d" % day),"a")
+            datafile.write("".join([line + "\n" for logtime, line in lines]))
+            datafile.close()
+
+
+def hms(seconds):
+    return "%02d:%02d:%02d" % (seconds // 3600,seconds // 60 % 60,seconds % 60)
+
+
+# exec_host list for cores cores on each of the given nodes, one entry per
+# core ("n5/3+n5/2") or per node as a range ("n5/0-7")
+def exec_host(nodes,cores,ranges):
+    if ranges:
+        if cores == 1:
+            return "+".join(["%s/0" % node for node in nodes])
+        return "+".join(["%s/0-%d" % (node,cores - 1) for node in nodes])
+    return "+".join(["%s/%d" % (node,core) for node in nodes \
+                     for core in range(cores - 1,-1,-1)])
+
+
+def generate(args):
+    rng = random.Random(args.seed)
+    if not os.path.isdir(args.output):
+        os.makedirs(args.output)
+    for filename in os.listdir(args.output):
+        os.remove(os.path.join(args.output,filename))
+
+    users = ["user%d" % i for i in range(args.users)]
+    queues = ["queue%d" % i for i in range(args.queues)]
+    nodes = ["n%d" % i for i in range(args.nodes)]
+    ppn_choices = [ppn for ppn in (1,2,4,8,12,16) if ppn <= args.cores_per_node]
+    first_day = int(time.mktime(time.strptime(args.start,"%Y-%m-%d")))
+    jobs_per_day = max(args.jobs // args.days,1)
+
+    log = LogWriter(args.output)
+    job_id = 1000000
+    for day in range(args.days):
+        day_start = first_day + day * 86400
+        count = jobs_per_day
+        if day == args.days - 1:
+            count = args.jobs - jobs_per_day * (args.days - 1)
+        for ctime in sorted([day_start + rng.randrange(86400) for i in range(count)]):
+            job_id += 1
+            # The product of two uniform numbers favours small indices, so
+            # the first few users submit most of the jobs
+            user_index = int(rng.random() * rng.random() * len(users))
+            user = users[user_index]
+            group = "group%d" % (user_index % args.groups)
+            gpus = 0
+            if rng.random() < args.gpu:
+                queue = "gpu"
+                gpus = rng.choice((1,1,2,4))
+                num_nodes = 1
+                ppn = min(rng.choice((1,1,3,4)),args.cores_per_node)
+            else:
+                queue = rng.choice(queues)
+                if rng.random() < args.multinode:
+                    num_nodes = rng.choice((2,2,4,4,8,16))
+                    ppn = args.cores_per_node
+                else:
+                    num_nodes = 1
+                    ppn = rng.choice(ppn_choices)
+            resources = "%d:ppn=%d" % (num_nodes,ppn)
+            if gpus:
+                resources += ":gpus=%d" % gpus
+            walltime = rng.choice((1,4,12,24,72,144)) * 3600
+            hold = 0
+            if rng.random() < 0.05:
+                hold = rng.randrange(3600)
+            etime = ctime + hold
+            start = etime + int(rng.expovariate(1.0 / args.mean_wait))
+            run = min(int(rng.lognormvariate(8,1.5)),walltime)
+            end = start + run
+            first_node = rng.randrange(len(nodes))
+            job_nodes = [nodes[(first_node + i) % len(nodes)] for i in range(num_nodes)]
+            ranges = args.exec_host == "ranges" or \
+                     (args.exec_host == "mixed" and rng.random() < 0.5)
+            hosts = exec_host(job_nodes,ppn,ranges)
+            jobname = "job%d" % rng.randrange(1000)
+            full_ID = "%d.%s" % (job_id,args.server)
+            requested = "user=%s group=%s jobname=%s queue=%s ctime=%d qtime=%d etime=%d " \
+                        "start=%d owner=%s@login0 exec_host=%s Resource_List.neednodes=%s " \
+                        "Resource_List.nodect=%d Resource_List.nodes=%s " \
+                        "Resource_List.walltime=%s" % \
+                        (user,group,jobname,queue,ctime,ctime,etime,start,user,hosts,\
+                         resources,num_nodes,resources,hms(walltime))
+            exit_status = 0
+            if rng.random() < args.failed:
+                exit_status = rng.choice((1,-11,271))
+            cpu = int(run * num_nodes * ppn * rng.uniform(0.5,1.0))
+            log.add(ctime,";Q;%s;queue=%s" % (full_ID,queue))
+            log.add(start,";S;%s;%s " % (full_ID,requested))
+            log.add(end,";E;%s;%s session=%d end=%d Exit_status=%d resources_used.cput=%s "\
+                        "resources_used.mem=%dkb resources_used.vmem=%dkb "\
+                        "resources_used.walltime=%s" % \
+                        (full_ID,requested,rng.randrange(1,99999),end,exit_status,hms(cpu),\
+                         rng.randrange(1000,8000000),rng.randrange(1000,16000000),hms(run)))
+        t = time.localtime(day_start)
+        log.flush((t.tm_year,t.tm_mon,t.tm_mday))
+    log.flush()
+    return job_id - 1000000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write synthetic Torque accounting logs")
+    parser.add_argument("-o","--output",required=True,help="directory for the log files; "\
+                        "it must be empty or new unless --force is given")
+    parser.add_argument("--force",action="store_true",\
+                        help="remove the files already in the output directory")
+    parser.add_argument("-n","--jobs",type=int,default=100000,\
+                        help="number of jobs, each with a Q, S and E record (default: %(default)s)")
+    parser.add_argument("--days",type=int,default=365,\
+                        help="number of days the jobs are submitted over (default: %(default)s)")
+    parser.add_argument("--start",default="2014-01-01",\
+                        help="first day of submissions, YYYY-MM-DD (default: %(default)s)")
+    parser.add_argument("--users",type=int,default=500,\
+                        help="number of users; the first few submit most of the jobs "\
+                             "(default: %(default)s)")
+    parser.add_argument("--groups",type=int,default=60,\
+                        help="number of groups the users are spread over (default: %(default)s)")
+    parser.add_argument("--queues",type=int,default=8,\
+                        help="number of queues besides gpu (default: %(default)s)")
+    parser.add_argument("--nodes",type=int,default=400,\
+                        help="number of compute nodes in the exec_host lists (default: %(default)s)")
+    parser.add_argument("--cores-per-node",type=int,default=16,\
+                        help="cores of every node; multinode jobs use them all "\
+                             "(default: %(default)s)")
+    parser.add_argument("--multinode",type=float,default=0.15,\
+                        help="fraction of multinode jobs (default: %(default)s)")
+    parser.add_argument("--gpu",type=float,default=0.05,\
+                        help="fraction of GPU jobs (default: %(default)s)")
+    parser.add_argument("--failed",type=float,default=0.05,\
+                        help="fraction of jobs with a non-zero exit status (default: %(default)s)")
+    parser.add_argument("--mean-wait",type=float,default=3600,\
+                        help="mean wait time in seconds (default: %(default)s)")
+    parser.add_argument("--exec-host",choices=("cores","ranges","mixed"),default="mixed",\
+                        help="list every core (n5/3+n5/2) or a range per node (n5/0-7) "\
+                             "(default: %(default)s)")
+    parser.add_argument("--server",default="clusman0.localdomain",\
+                        help="Torque server in the job IDs; logs of several clusters "\
+                             "can be made with one directory per server (default: %(default)s)")
+    parser.add_argument("--seed",type=int,default=1,\
+                        help="seed of the random numbers; the same seed gives the same "\
+                             "files (default: %(default)s)")
+    args = parser.parse_args(argv)
+    if os.path.isdir(args.output) and os.listdir(args.output) and not args.force:
+        parser.error("%s is not empty; use --force to replace the files in it" % args.output)
+
+    started = time.time()
+    jobs = generate(args)
+    print ("Wrote %d jobs to %s in %.1f s") % (jobs,args.output,time.time() - started)
+
+
+if __name__ == "__main__":
+    main()
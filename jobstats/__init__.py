@@ -0,0 +1,21 @@
+# Summaries of Torque job accounting logs.
+#
+#   jobstats.settings    report windows and sections, and other constants
+#   jobstats.profiling   phase timings and memory use for --profile
+#   jobstats.logfiles    reading plain and compressed accounting files
+#   jobstats.records     decoding of accounting records (JobRecord)
+#   jobstats.table       JobTable, the columnar store of jobs, Job and JobIndex
+#   jobstats.ingest      load_jobs(): reading files through the cache, and
+#                        deduplication
+#   jobstats.summary     SummaryStats and the tables they print
+#   jobstats.aggregate   window queries over a JobTable
+#   jobstats.rollup      the daily rollup cube
+#   jobstats.stream      the summary report in chunks, for --memory-budget
+#   jobstats.usage       utilization and queue-backlog timelines, node usage
+#   jobstats.efficiency  CPU, walltime and memory efficiency (--efficiency)
+#   jobstats.report      the summary report, batch and --follow
+#   jobstats.server      the resident query server (--serve)
+#   jobstats.cli         the command line (python -m jobstats)
+#
+# Nothing is imported here, so that the command line starts without
+# loading NumPy before its arguments are parsed; import from the modules.
@@ -0,0 +1,3 @@
+from jobstats.cli import main
+
+main()
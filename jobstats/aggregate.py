@@ -0,0 +1,256 @@
+# Window queries over a JobTable: the SummaryStats of every (name, window)
+# pair of a grouping, from one sorted index per grouping
+from collections import OrderedDict
+import numpy as np
+from jobstats.settings import report_sections
+from jobstats.summary import LogHistogram, SummaryStats
+
+# Sum of ufunc over v[starts[i]:ends[i]] for every i, identity where empty
+def segment_reduce(ufunc,v,starts,ends,identity):
+    result = np.empty(len(starts),dtype=v.dtype)
+    result.fill(identity)
+    lengths = ends - starts
+    full = np.flatnonzero(lengths > 0)
+    if len(full) > 0:
+        lengths = lengths[full]
+        offsets = np.cumsum(lengths) - lengths
+        index = np.repeat(starts[full] - offsets,lengths) + np.arange(lengths.sum())
+        result[full] = ufunc.reduceat(v[index],offsets)
+    return result
+
+
+# Index over the jobs of a JobTable (or just rows) for window queries.  Jobs
+# are sorted by (name in column, ctime) and every metric gets a prefix-sum
+# array, so the count, sum and average of any [start, end] window for any
+# name comes from two binary searches.  Min and max come from a sparse table
+# over fixed-size blocks plus a scan of the partial blocks at either end.
+class WindowIndex:
+    block = 64
+    metrics = ('wait','run','turnaround','cores','nodes')
+
+    def __init__(self,table,column=None,rows=None):
+        columns = table.columns
+        self.table  = table
+        codes, self.names = table.grouping(column)
+        if rows is None:
+            rows = np.arange(table.size)
+        order = np.lexsort((rows,columns['ctime'][rows],codes[rows]))
+        self.rows  = rows[order]
+        self.codes = codes[self.rows].astype(np.int64)
+        self.keys  = (self.codes << 32) + columns['ctime'][self.rows]
+        self.present = np.unique(self.codes)
+
+        self.values = self.metric_values(columns,self.rows)
+        self.prefix = dict()
+        self.sparse = dict()
+        for metric, v in self.values.items():
+            self.prefix[metric] = np.concatenate(([0],np.cumsum(v)))
+            self.sparse[metric] = (self._sparse_table(np.minimum,v,np.iinfo(np.int64).max),\
+                                   self._sparse_table(np.maximum,v,np.iinfo(np.int64).min))
+
+    # The value of every metric for each of rows, as metric -> int64 array
+    def metric_values(self,columns,rows):
+        wait = np.maximum(columns['start'] - columns['etime'],0)[rows]
+        run  = np.maximum(columns['end'] - columns['start'],0)[rows]
+        return {'wait':wait,'run':run,'turnaround':wait + run,\
+                'cores':columns['num_cores'][rows],'nodes':columns['unique_nodes'][rows]}
+
+    # Level k holds the reduction over 2**k consecutive blocks
+    def _sparse_table(self,ufunc,v,identity):
+        num_blocks = max((len(v) + self.block - 1) // self.block,1)
+        padded = np.empty(num_blocks * self.block,dtype=np.int64)
+        padded.fill(identity)
+        padded[:len(v)] = v
+        levels = [ufunc.reduce(padded.reshape(num_blocks,self.block),axis=1)]
+        width = 1
+        while 2 * width <= num_blocks:
+            last = levels[-1]
+            level = last.copy()
+            level[:num_blocks - width] = ufunc(last[:num_blocks - width],last[width:])
+            levels.append(level)
+            width *= 2
+        return np.array(levels)
+
+    # ufunc over positions [lo, hi) of a metric, for arrays of ranges
+    def _range_reduce(self,metric,which,lo,hi):
+        ufunc, identity = ((np.minimum,np.iinfo(np.int64).max),\
+                           (np.maximum,np.iinfo(np.int64).min))[which]
+        v = self.values[metric]
+        table = self.sparse[metric][which]
+        block = self.block
+        first_block = lo // block + 1
+        last_block = hi // block
+        # Partial blocks at either end
+        left_end = np.minimum(hi,first_block * block)
+        right_start = np.maximum(left_end,last_block * block)
+        result = ufunc(segment_reduce(ufunc,v,lo,left_end,identity),\
+                       segment_reduce(ufunc,v,right_start,hi,identity))
+        # Whole blocks in between, from two overlapping sparse table entries
+        inner = np.flatnonzero(last_block > first_block)
+        if len(inner) > 0:
+            a = first_block[inner]
+            b = last_block[inner]
+            k = np.log2(b - a).astype(int)
+            result[inner] = ufunc(result[inner],\
+                                  ufunc(table[k,a],table[k,b - (1 << k)]))
+        return result
+
+    # Positions [lo, hi) of the jobs of every present name (or of the names
+    # with codes present) in every window, as arrays of shape (names, windows)
+    def ranges(self,windows,present=None):
+        if present is None:
+            present = self.present
+        base = (present << 32)[:,np.newaxis]
+        starts = np.array([max(start_t,0) for (label,start_t,end_t) in windows],dtype=np.int64)
+        ends = np.array([min(end_t,(1 << 32) - 1) for (label,start_t,end_t) in windows],dtype=np.int64)
+        lo = np.searchsorted(self.keys,base + starts,'left')
+        hi = np.searchsorted(self.keys,base + ends,'right')
+        return lo, np.maximum(hi,lo)
+
+    # The totals of every non-empty (name, window) pair as a list of (code,
+    # window index, SummaryStats).  Only the user/group/queue breakdowns
+    # named in details are filled in, and the percentile sketches only with
+    # percentiles set.  codes limits the names to those codes.
+    def stats(self,windows,details=('users','groups','queues'),percentiles=False,codes=None):
+        result = list()
+        if len(windows) == 0 or len(self.rows) == 0:
+            return result
+        present = self.present
+        if codes is not None:
+            present = np.intersect1d(present,np.asarray(codes,dtype=np.int64))
+        lo, hi = self.ranges(windows,present)
+        lo = lo.ravel()
+        hi = hi.ravel()
+        nonempty = np.flatnonzero(hi > lo)
+        lo = lo[nonempty]
+        hi = hi[nonempty]
+        totals = dict()
+        for metric in self.metrics:
+            prefix = self.prefix[metric]
+            totals[metric] = (prefix[hi] - prefix[lo],\
+                              self._range_reduce(metric,0,lo,hi),\
+                              self._range_reduce(metric,1,lo,hi))
+
+        num_windows = len(windows)
+        for q, query in enumerate(nonempty):
+            p, w = divmod(int(query),num_windows)
+            code = int(present[p])
+            label, start_t, end_t = windows[w]
+            stats = SummaryStats(self.names[code],label,start_t,end_t,percentiles)
+            stats.num_jobs = int(hi[q] - lo[q])
+            for metric in self.metrics:
+                sums, mins, maxs = totals[metric]
+                setattr(stats,metric + '_sum',int(sums[q]))
+                setattr(stats,metric + '_min',int(mins[q]))
+                setattr(stats,metric + '_max',int(maxs[q]))
+            result.append((code,w,stats))
+
+        if len(details) == 0 and not percentiles:
+            return result
+        lengths = hi - lo
+        offsets = np.cumsum(lengths) - lengths
+        positions = np.repeat(lo - offsets,lengths) + np.arange(lengths.sum())
+        queries = np.repeat(np.arange(len(lo)),lengths)
+
+        # Histogram of each percentile metric inside every window, from the
+        # counts of (window, bucket) pairs
+        if percentiles:
+            num_buckets = LogHistogram.num_buckets
+            for metric in SummaryStats.percentile_metrics:
+                keys = queries * num_buckets + \
+                       LogHistogram.bucket(self.values[metric][positions])
+                unique_keys, counts = np.unique(keys,return_counts=True)
+                bounds = np.searchsorted(unique_keys // num_buckets,np.arange(len(lo) + 1))
+                for q in range(len(lo)):
+                    first, last = bounds[q], bounds[q + 1]
+                    result[q][2].sketches[metric] = \
+                        LogHistogram(unique_keys[first:last] % num_buckets,\
+                                     counts[first:last].astype(np.int64))
+
+        # Job count and CPU time per user/group/queue inside every window
+        if len(details) > 0:
+            detail_rows = self.rows[positions]
+            cpu = self.table.columns['cpu_secs'][detail_rows]
+            for detail, kind in (('user','users'),('group','groups'),('queue','queues')):
+                if kind not in details:
+                    continue
+                detail_names = self.table.names[detail]
+                keys = queries * len(detail_names) + self.table.columns[detail][detail_rows]
+                unique_keys, inverse, counts = \
+                    np.unique(keys,return_inverse=True,return_counts=True)
+                cpu_sums = np.zeros(len(unique_keys),dtype=np.int64)
+                np.add.at(cpu_sums,inverse,cpu)
+                for e, key in enumerate(unique_keys):
+                    q, code = divmod(int(key),len(detail_names))
+                    result[q][2].add_usage(kind,detail_names[code],\
+                                           int(counts[e]),int(cpu_sums[e]))
+        return result
+
+
+# The totals of every non-empty (name in column, window) pair of a JobTable,
+# as a list of (code, window index, SummaryStats).  column None groups every
+# job under the single name "all"; rows restricts the jobs counted.
+def grouped_window_stats(table,column,windows,rows=None,details=('users','groups','queues'),\
+                         percentiles=False):
+    return WindowIndex(table,column,rows).stats(windows,details,percentiles)
+
+
+# SummaryStats for every name in column (or "all" when column is None) and
+# every window, as an OrderedDict of name -> list of SummaryStats in window
+# order, ready for CombinedSummaryTable.  Names are in order of first
+# appearance; with rows given only those jobs (and their names) count.
+# index is a WindowIndex over column of jobs including rows to use instead
+# of building one.
+def GroupedSummaryStats(table,column,windows,rows=None,details=('users','groups','queues'),\
+                        percentiles=False,index=None):
+    codes, names = table.grouping(column)
+    if column is None:
+        present = [0]
+    elif rows is None:
+        present = range(len(names))
+    else:
+        present = np.unique(codes[rows]).tolist()
+    result = OrderedDict()
+    for code in present:
+        result[names[code]] = [SummaryStats(names[code],label,start_t,end_t,percentiles) \
+                               for (label,start_t,end_t) in windows]
+    if index is None:
+        stats = grouped_window_stats(table,column,windows,rows,details,percentiles)
+    else:
+        stats = index.stats(windows,details,percentiles,present)
+    for code, w, window_stats in stats:
+        result[names[code]][w] = window_stats
+    return result
+
+
+# Merge the SummaryStats of a GroupedSummaryStats() result (of other jobs)
+# into another one, adding the names it hasn't got at the end
+def merge_grouped(into,other):
+    for name, stats_list in other.items():
+        if name in into:
+            for old, stats in zip(into[name],stats_list):
+                old.merge(stats)
+        else:
+            into[name] = stats_list
+    return into
+
+
+
+# The report_sections entries named in sections, in report order (every
+# one when sections is None)
+def selected_sections(sections=None):
+    return [entry for entry in report_sections if sections is None or entry[0] in sections]
+
+
+# Rows of a report section: the jobs among rows (every job when None) of
+# its multinode kind and, when names (column -> list of names) has some for
+# its column, of those names only.  None stands for every row.
+def section_rows(table,column,multinode,names=None,rows=None):
+    if multinode is not None:
+        if rows is None:
+            rows = table.rows('multinode',multinode)
+        else:
+            rows = rows[table.columns['multinode'][rows] == multinode]
+    if column is not None and names is not None and names.get(column) is not None:
+        rows = table.rows_in(column,names[column],rows)
+    return rows
@@ -0,0 +1,316 @@
+# Command line of jobstats.  Only argparse and the settings module are
+# imported up front; NumPy and the report machinery are imported once the
+# arguments have been parsed, so --help and argument errors come back at
+# once.
+import argparse
+import os
+import stat
+import time
+from jobstats.settings import default_windows, report_sections, seconds_per_day, \
+                              utilization_bins
+
+
+# Command-line window options.  Each returns a list of (label, start, end,
+# rolling) windows, in the form of default_windows.
+def parse_time(text,end_of_day=False):
+    for fmt in ('%Y-%m-%d %H:%M:%S','%Y-%m-%d','%Y.%m.%d %H:%M:%S','%Y.%m.%d'):
+        try:
+            t = time.strptime(text,fmt)
+        except ValueError:
+            continue
+        if end_of_day and ' ' not in fmt:
+            # Last second of the day
+            return int(time.mktime((t.tm_year,t.tm_mon,t.tm_mday + 1,0,0,0,0,0,-1))) - 1
+        return int(time.mktime(t))
+    raise argparse.ArgumentTypeError("can't read %r as a date (use YYYY-MM-DD)" % text)
+
+
+def last_days_window(text):
+    days = int(text)
+    if days < 0:
+        raise argparse.ArgumentTypeError("DAYS can't be negative, got %r" % text)
+    return [("Past %d days" % days,days*seconds_per_day,0,True)]
+
+
+def weeks_windows(text):
+    weeks = int(text)
+    if weeks <= 0:
+        raise argparse.ArgumentTypeError("N must be at least 1, got %r" % text)
+    windows = list()
+    for week in range(1,weeks + 1):
+        # Each week ends the second before the next one starts
+        end_t = 7*(week - 1)*seconds_per_day
+        if week > 1:
+            end_t += 1
+        windows.append(("Week -%d" % week,7*week*seconds_per_day,end_t,True))
+    return windows
+
+
+def year_window(text):
+    year = int(text)
+    return [(str(year),parse_time("%d-01-01" % year),parse_time("%d-12-31" % year,True),False)]
+
+
+# NAME or NAME=START,END for --node; without dates every job on the node
+def node_query(text):
+    name, sep, dates = text.partition('=')
+    if not sep:
+        return (name,0,(1 << 32) - 1)
+    try:
+        first, last = dates.split(',')
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected NAME=START,END, got %r" % text)
+    return (name,parse_time(first),parse_time(last,True))
+
+
+def range_window(text):
+    try:
+        label, dates = text.split('=',1)
+        first, last = dates.split(',')
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected LABEL=START,END, got %r" % text)
+    start_t, end_t = parse_time(first), parse_time(last,True)
+    if end_t < start_t:
+        raise argparse.ArgumentTypeError("END is before START in %r" % text)
+    return [(label,start_t,end_t,False)]
+
+
+# --serve ADDRESS: the path of a Unix socket (anything with a '/') or
+# [HOST:]PORT, as (host, port) with HOST defaulting to localhost
+def serve_address(text):
+    if '/' in text:
+        return text
+    host, colon, port = text.rpartition(':')
+    if not port.isdigit() or int(port) > 65535:
+        raise argparse.ArgumentTypeError("expected [HOST:]PORT or the path of a Unix socket "\
+                                         "(with a '/'), got %r" % text)
+    return (host or "localhost",int(port))
+
+
+# The sections to compute and the names to limit them to, as the sections
+# and names arguments of report_stats().  Names given without --section pick
+# their sections; with --job and neither, no section is printed.
+def report_selection(args):
+    names = dict()
+    for column, given in (('user',args.users),('group',args.groups),('queue',args.queues)):
+        if given:
+            names[column] = given
+    sections = args.sections
+    if sections is None and len(names) > 0:
+        sections = [section for section, column, multinode, details in report_sections \
+                    if column in names]
+    if sections is None and args.jobs:
+        sections = []
+    return sections, names or None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize Torque job accounting logs")
+    parser.add_argument("-d","--data-dir",default="./Data",\
+                        help="directory of accounting files (default: %(default)s)")
+    parser.add_argument("-j","--workers",type=int,default=1,\
+                        help="processes used to parse the accounting files; "\
+                             "0 uses every CPU (default: %(default)s)")
+    parser.add_argument("--cache-dir",default="./.JobStats_cache",\
+                        help="where parsed accounting files are cached (default: %(default)s)")
+    parser.add_argument("--slack",type=int,default=90,metavar="DAYS",\
+                        help="read date-named files (YYYYMMDD) only from the start of "\
+                             "the earliest report window to DAYS days after the end of "\
+                             "the latest, to catch jobs that ended after their window "\
+                             "(default: %(default)s)")
+    parser.add_argument("--all-files",action="store_true",\
+                        help="read every file, whatever its date")
+    parser.add_argument("--no-cache",action="store_true",\
+                        help="parse every file and leave the cache alone")
+    parser.add_argument("--rebuild-cache",action="store_true",\
+                        help="re-parse every file and rewrite its cache entry")
+    parser.add_argument("--no-rollup",action="store_true",\
+                        help="aggregate every job instead of the daily rollup kept in the "\
+                             "cache directory (the rollup is not used with --percentiles, "\
+                             "--user, --group or --queue)")
+    parser.add_argument("--memory-budget",type=int,metavar="MB",\
+                        help="read the files in chunks of jobs that fit in about MB "\
+                             "megabytes, folding each into the report before the next, "\
+                             "instead of holding every job in memory; the files are read "\
+                             "twice and the daily rollup is not used (can't be combined "\
+                             "with --follow, --job, --utilization or the node reports)")
+    parser.add_argument("--by-server",action="store_true",\
+                        help="also report the jobs of every Torque server (the part of "\
+                             "the job ID after the number) on its own, aggregating the "\
+                             "servers in parallel with --workers; the report of all "\
+                             "jobs is merged from theirs")
+    parser.add_argument("--clear-cache",action="store_true",\
+                        help="delete the cache directory and exit")
+    parser.add_argument("-f","--follow",type=int,nargs="?",const=60,metavar="SECONDS",\
+                        help="keep running, folding in records as they are appended, "\
+                             "and reprint the report every SECONDS (default: 60)")
+    parser.add_argument("--serve",type=serve_address,metavar="ADDRESS",\
+                        help="keep the jobs in memory and answer report queries over "\
+                             "HTTP on ADDRESS, [HOST:]PORT (localhost by default) or the "\
+                             "path of a Unix socket, e.g. /report?user=NAME&last=60&format=json")
+    parser.add_argument("--reload-interval",type=int,default=60,metavar="SECONDS",\
+                        help="with --serve, check the data directory for new or changed "\
+                             "files every SECONDS and reload them; 0 only reloads on a "\
+                             "/reload query (default: %(default)s)")
+    parser.add_argument("--percentiles",action="store_true",\
+                        help="also report the median, 90th and 99th percentile wait, "\
+                             "run and turnaround times")
+    parser.add_argument("--utilization",choices=sorted(utilization_bins),\
+                        help="also print the average and peak cores, nodes and GPUs "\
+                             "in use per hour or day")
+    parser.add_argument("--utilization-by",choices=('queue','group','user'),\
+                        help="break the utilization timeline down by queue, group or user")
+    parser.add_argument("--backlog",choices=sorted(utilization_bins),\
+                        help="also print the jobs waiting in each queue, the cores they "\
+                             "asked for and the jobs held, as a peak summary of every "\
+                             "report window and a timeline per hour or day")
+    parser.add_argument("--backlog-by",choices=('queue','group','user'),default='queue',\
+                        help="break the backlog down by queue, group or user "\
+                             "(default: %(default)s)")
+    parser.add_argument("--profile",action="store_true",\
+                        help="time every phase of the run (ingest of each file, "\
+                             "aggregation of each section, rendering) and print the "\
+                             "timings as a line of JSON at the end")
+    parser.add_argument("--profile-dump",metavar="FILE",\
+                        help="write cProfile statistics of the run to FILE (and the top "\
+                             "allocation sites to FILE.tracemalloc where tracemalloc "\
+                             "is available)")
+    parser.add_argument("--efficiency",action="append",choices=('user','group','queue'),\
+                        help="also print the CPU efficiency, the walltime used against "\
+                             "that requested and the peak memory of the jobs of every "\
+                             "user, group or queue in every window; may be repeated")
+    parser.add_argument("--busiest-nodes",type=int,metavar="N",\
+                        help="also list the N nodes with the most core hours in every window")
+    parser.add_argument("--idle-nodes",action="store_true",\
+                        help="also list the nodes that ran no jobs in every window")
+    parser.add_argument("--node",type=node_query,action="append",metavar="NAME[=START,END]",\
+                        help="list the jobs that ran on node NAME, optionally only "\
+                             "between two dates (YYYY-MM-DD[ HH:MM:SS])")
+    parser.add_argument("--job",action="append",dest="jobs",metavar="ID",\
+                        help="print the accounting record of job ID (e.g. 1664357, "\
+                             "1664357[90] or 1664357.clusman0); may be repeated")
+    summary = parser.add_argument_group("report sections",\
+        "By default every section is printed with every user, group and queue. "\
+        "--user, --group and --queue limit their sections to the names given and, "\
+        "without --section, print only those sections.  Only what is printed is "\
+        "computed.")
+    summary.add_argument("--section",action="append",dest="sections",\
+                         choices=[entry[0] for entry in report_sections],\
+                         help="print this section (all jobs, by user, group or queue, "\
+                              "single- or multi-node jobs); may be repeated")
+    summary.add_argument("--user",action="append",dest="users",metavar="NAME",\
+                         help="limit the user section to NAME; may be repeated")
+    summary.add_argument("--group",action="append",dest="groups",metavar="NAME",\
+                         help="limit the group section to NAME; may be repeated")
+    summary.add_argument("--queue",action="append",dest="queues",metavar="NAME",\
+                         help="limit the queue section to NAME; may be repeated")
+    windows = parser.add_argument_group("report windows",\
+        "Any of these replace the default windows (the past 30, 60 and 90 days "\
+        "and the years 2015, 2014 and 2013) and are reported in the order given. "\
+        "Jobs are counted in a window by their submit time.")
+    windows.add_argument("--last",type=last_days_window,action="append",dest="windows",\
+                         metavar="DAYS",help="the DAYS days up to now")
+    windows.add_argument("--weeks",type=weeks_windows,action="append",dest="windows",\
+                         metavar="N",help="each of the N weeks up to now")
+    windows.add_argument("--year",type=year_window,action="append",dest="windows",\
+                         metavar="YYYY",help="a calendar year")
+    windows.add_argument("--window",type=range_window,action="append",dest="windows",\
+                         metavar="LABEL=START,END",\
+                         help="a custom range of dates (YYYY-MM-DD[ HH:MM:SS]), "\
+                              "e.g. FY2015=2014-07-01,2015-06-30")
+    args = parser.parse_args(argv)
+
+    if args.memory_budget is not None and \
+       (args.follow is not None or args.jobs or args.utilization is not None or \
+        args.backlog is not None or \
+        args.busiest_nodes is not None or args.idle_nodes or args.node or args.by_server or \
+        args.efficiency or args.serve):
+        parser.error("--memory-budget only makes the summary report")
+    # follow() has no per-server, node or job reports
+    if args.follow is not None and args.by_server:
+        parser.error("--by-server can't be combined with --follow")
+    if args.follow is not None and args.jobs:
+        parser.error("--job can't be combined with --follow")
+    if args.follow is not None and \
+       (args.busiest_nodes is not None or args.idle_nodes or args.node):
+        parser.error("--busiest-nodes, --idle-nodes and --node can't be combined with --follow")
+    # The profile covers one run of the report
+    if (args.profile or args.profile_dump) and (args.follow is not None or args.serve is not None):
+        parser.error("--profile and --profile-dump can't be combined with --follow or --serve")
+    # Queries choose their own report
+    if args.serve is not None:
+        if args.follow is not None or args.jobs or args.utilization is not None or \
+           args.backlog is not None or args.busiest_nodes is not None or args.idle_nodes or \
+           args.node or args.by_server or args.efficiency or args.percentiles or \
+           args.windows or args.sections or args.users or args.groups or args.queues:
+            parser.error("--serve takes the report options as query parameters")
+        if not isinstance(args.serve,tuple) and os.path.exists(args.serve) and \
+           not stat.S_ISSOCK(os.stat(args.serve).st_mode):
+            parser.error("--serve: %s exists and is not a socket" % args.serve)
+
+    report_windows_spec = default_windows
+    if args.windows:
+        report_windows_spec = [window for group in args.windows for window in group]
+
+    if args.clear_cache:
+        import shutil
+        if os.path.isdir(args.cache_dir):
+            shutil.rmtree(args.cache_dir)
+        print ("Removed cache directory %s") % args.cache_dir
+        return
+
+    sections, names = report_selection(args)
+
+    data_dir = args.data_dir
+    slack_days = args.slack
+    # A job can be in any file, and an idle node is one that only shows up
+    # in files outside the windows
+    if args.all_files or args.jobs or args.idle_nodes or \
+       any([start_t == 0 for name, start_t, end_t in args.node or ()]):
+        slack_days = None
+    workers = args.workers
+    if workers <= 0:
+        import multiprocessing
+        workers = multiprocessing.cpu_count()
+    cache_dir = args.cache_dir
+    if args.no_cache:
+        cache_dir = None
+
+    if args.serve is not None:
+        from jobstats.server import serve
+        serve(args.serve,data_dir,workers,cache_dir,args.reload_interval)
+        return
+
+    from jobstats.profiling import profiler
+    from jobstats.report import batch_report, follow
+    if args.follow is not None:
+        follow(data_dir,args.follow,workers,cache_dir,args.rebuild_cache,\
+               report_windows_spec,args.percentiles,args.utilization,args.utilization_by,\
+               args.backlog,args.backlog_by,args.efficiency or (),slack_days,sections,names)
+        return
+
+    profiler.enabled = args.profile
+    if args.profile_dump is None:
+        batch_report(args,data_dir,workers,cache_dir,report_windows_spec,slack_days,\
+                     sections,names)
+    else:
+        import cProfile
+        try:
+            import tracemalloc
+        except ImportError:
+            tracemalloc = None
+        if tracemalloc is not None:
+            tracemalloc.start()
+        hot = cProfile.Profile()
+        hot.runcall(batch_report,args,data_dir,workers,cache_dir,report_windows_spec,\
+                    slack_days,sections,names)
+        hot.dump_stats(args.profile_dump)
+        if tracemalloc is not None:
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            dump = open(args.profile_dump + ".tracemalloc","w")
+            for site in snapshot.statistics('lineno')[:50]:
+                dump.write(str(site) + "\n")
+            dump.close()
+    if profiler.enabled:
+        print (profiler.trailer())
@@ -0,0 +1,72 @@
+# CPU efficiency, used against requested walltime and memory high-water
+# mark per user, group or queue, and their report
+import numpy as np
+from jobstats.aggregate import WindowIndex
+from jobstats.summary import secs_to_hours
+
+bytes_to_gb = 1.0 / 2**30
+
+# WindowIndex over the resource use of jobs.  The sums give CPU efficiency
+# (CPU time over walltime times cores) and the fraction of the requested
+# walltime used, counted over the jobs that asked for one; the maximum of
+# mem is the high-water mark.
+class EfficiencyIndex(WindowIndex):
+    metrics = ('cpu','core_walltime','asked_walltime','req_walltime','mem')
+
+    def metric_values(self,columns,rows):
+        walltime = columns['walltime_secs'][rows]
+        requested = columns['req_walltime_secs'][rows]
+        return {'cpu':columns['cpu_secs'][rows],\
+                'core_walltime':walltime * columns['num_cores'][rows],\
+                'asked_walltime':np.where(requested > 0,walltime,0),\
+                'req_walltime':requested,\
+                'mem':columns['mem_bytes'][rows]}
+
+    # The totals of every non-empty (name, window) pair as a list of (name,
+    # window index, jobs, metric -> sum, peak mem)
+    def totals(self,windows):
+        result = list()
+        if len(windows) == 0 or len(self.rows) == 0:
+            return result
+        lo, hi = self.ranges(windows)
+        lo = lo.ravel()
+        hi = hi.ravel()
+        nonempty = np.flatnonzero(hi > lo)
+        lo = lo[nonempty]
+        hi = hi[nonempty]
+        sums = dict([(metric,self.prefix[metric][hi] - self.prefix[metric][lo]) \
+                     for metric in self.metrics])
+        peaks = self._range_reduce('mem',1,lo,hi)
+        for q, query in enumerate(nonempty):
+            p, w = divmod(int(query),len(windows))
+            result.append((self.names[int(self.present[p])],w,int(hi[q] - lo[q]),\
+                           dict([(metric,int(sums[metric][q])) for metric in self.metrics]),\
+                           int(peaks[q])))
+        return result
+
+
+def percent(part,whole):
+    if whole == 0:
+        return 0.0
+    return 100.0 * part / whole
+
+
+# Efficiency of the jobs of every name in column in every report window,
+# names in alphabetical order
+def print_efficiency(JobList,windows,column):
+    print ("********************************************************************************")
+    print ((" Efficiency by %s " % column).center(80,'*'))
+    print ("********************************************************************************")
+    totals = EfficiencyIndex(JobList,column).totals(windows)
+    for w, (label, start_t, end_t) in enumerate(windows):
+        print ("%s") % label
+        print ("%-15s%8s%9s%14s%13s%7s%13s") % \
+              (column.capitalize(),"Jobs","CPU eff","Wall used h","Wall asked h","Used",\
+               "Peak mem GB")
+        print ("--------------------------------------------------------------------------------")
+        for name, window, jobs, sums, peak in sorted([entry for entry in totals if entry[1] == w]):
+            print ("%-15s%8d%8.1f%%%14.1f%13.1f%6.1f%%%13.2f") % \
+                  (name,jobs,percent(sums['cpu'],sums['core_walltime']),\
+                   sums['asked_walltime'] * secs_to_hours,sums['req_walltime'] * secs_to_hours,\
+                   percent(sums['asked_walltime'],sums['req_walltime']),peak * bytes_to_gb)
+        print ("\n")
@@ -0,0 +1,204 @@
+# Reading accounting files into JobTables, through the on-disk cache of
+# parsed files and, optionally, a pool of worker processes
+import hashlib
+import mmap
+import os
+import numpy as np
+from jobstats.logfiles import compression, decompressed_chunks
+from jobstats.profiling import PhaseProfiler, profiler
+from jobstats.records import parse_job_id, record_decoders, record_defaults
+from jobstats.table import PARSER_VERSION, JobIndex, JobTable
+
+# Append the successful E records in data[begin:end] to table.  data is a
+# str or mmap of a whole accounting file, or of the part of one that starts
+# at byte base.  Only E records are tokenized: the scan jumps from one
+# ";E;" to the next and checks that it is the record type field of its line.
+def parse_accounting_data(data,begin,end,table,datafile_name,base=0):
+    decoders = record_decoders
+    pos = data.find(";E;",begin,end)
+    while pos >= 0:
+        line_start = data.rfind("\n",begin,pos) + 1
+        if line_start == 0:
+            line_start = begin
+        line_end = data.find("\n",pos,end)
+        if line_end < 0:
+            line_end = end
+        if line_start < pos and data.find(";",line_start,pos) < 0:
+            parts = data[pos+3:line_end].split(';',2)
+            values = list(record_defaults)
+            if len(parts) > 1:
+                for item in parts[1].split():
+                    key, sep, value = item.partition('=')
+                    decoder = decoders.get(key)
+                    if decoder is not None and sep:
+                        values[decoder[0]] = decoder[1](value)
+            # Only include successful jobs that were placed on a node
+            if values[12] == 0 and values[11] is not None:
+                # Catch some bad data where start time = 0
+                values[3] = max(values[3],values[2])
+                job_id, array_index, server = parse_job_id(parts[0])
+                table.append_row((values[0],values[1],values[2],values[3],values[4],\
+                                  values[11].num_cores,values[5],values[6],values[7],\
+                                  values[13],job_id,array_index,values[14],values[15],\
+                                  values[16],values[17]),\
+                                 (values[8],values[9],values[10],server),values[11],\
+                                 datafile_name,base + line_start)
+        pos = data.find(";E;",line_end,end)
+
+
+# read_job_records() for a compressed file.  The whole file is decompressed
+# as a stream and parsed a chunk of whole lines at a time; offsets are into
+# the decompressed data.  A compressed file is complete, so its last line
+# is read even without a newline.
+def read_compressed_records(datafile_name,offset=0):
+    table = JobTable()
+    base = 0
+    data = ""
+    for chunk in decompressed_chunks(datafile_name):
+        data += chunk
+        cut = data.rfind("\n") + 1
+        if base + cut > offset:
+            parse_accounting_data(data,max(offset - base,0),cut,table,datafile_name,base)
+        base += cut
+        data = data[cut:]
+    if data and base + len(data) > offset:
+        parse_accounting_data(data,max(offset - base,0),len(data),table,datafile_name,base)
+    table.freeze()
+    return table, max(base + len(data),offset)
+
+
+# Read the successful jobs in an accounting file, from byte offset on, into
+# a new JobTable.  Returns the table and the offset just past the last line
+# read.  With whole_lines set, a last line that has no newline yet (the
+# server is still writing it) is left for the next read.  Compressed files
+# (see decompress_commands) are read through a decompressor.
+def read_job_records(datafile_name,offset=0,whole_lines=False):
+    if compression(datafile_name) is not None:
+        return read_compressed_records(datafile_name,offset)
+    table = JobTable()
+    end = os.path.getsize(datafile_name)
+    if end > offset:
+        datafile = open(datafile_name,"rb")
+        data = mmap.mmap(datafile.fileno(),0,access=mmap.ACCESS_READ)
+        if whole_lines:
+            end = max(data.rfind("\n",offset,end) + 1,offset)
+        parse_accounting_data(data,offset,end,table,datafile_name)
+        data.close()
+        datafile.close()
+    else:
+        end = offset
+    table.freeze()
+    return table, end
+
+
+# Read a whole accounting file.  This is also the unit of work handed to
+# each process by the parallel ingest.
+def read_accounting_file(datafile_name):
+    return read_job_records(datafile_name)[0]
+
+
+# Parsed accounting files are cached as JobTables under cache_dir, one
+# directory per source file.  An entry is only reused while the file's
+# path, size and mtime and the parser version all match.
+def cache_entry(cache_dir,datafile_name):
+    return os.path.join(cache_dir,hashlib.sha1(os.path.abspath(datafile_name)).hexdigest())
+
+
+def cache_key(datafile_name):
+    info = os.stat(datafile_name)
+    return (os.path.abspath(datafile_name),info.st_size,repr(info.st_mtime),PARSER_VERSION)
+
+
+# Read one accounting file, going through the cache unless cache_dir is None.
+# With rebuild set the file is always parsed and its cache entry rewritten.
+def read_job_file(task):
+    datafile_name, cache_dir, rebuild = task
+    if cache_dir is None:
+        return read_accounting_file(datafile_name)
+    entry = cache_entry(cache_dir,datafile_name)
+    key = cache_key(datafile_name)
+    if not rebuild:
+        table = JobTable.load(entry,key)
+        if table is not None:
+            # The entry keeps the name the file was first read by, which
+            # may be relative to another working directory
+            table.files = [datafile_name for filename in table.files]
+            return table
+    table = read_accounting_file(datafile_name)
+    table.save(entry,key)
+    return table
+
+
+# read_job_file() timed as an "ingest/<file>" phase, for --profile.  This
+# runs in the worker processes of the parallel ingest, so the timings are
+# taken there and returned with the table.
+def profiled_read_job_file(task):
+    worker = PhaseProfiler(True)
+    with worker.phase("ingest/" + os.path.basename(task[0])) as entry:
+        table = read_job_file(task)
+        entry['records'] = len(table)
+    return table, entry
+
+
+# Read a list of accounting files into one JobTable.  With more than one
+# worker the files are parsed by a process pool; the per-file tables are
+# merged in file order, so the result is identical to the serial read.
+def load_jobs(file_names,workers=1,cache_dir=None,rebuild=False):
+    if cache_dir is not None and not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir)
+    tasks = [(datafile_name,cache_dir,rebuild) for datafile_name in file_names]
+    reader = read_job_file
+    if profiler.enabled:
+        reader = profiled_read_job_file
+    tables = list()
+    pool = None
+    if workers > 1 and len(tasks) > 1:
+        import multiprocessing
+        pool = multiprocessing.Pool(min(workers,len(tasks)))
+        results = pool.imap(reader,tasks)
+    else:
+        results = (reader(task) for task in tasks)
+    try:
+        for table in results:
+            if profiler.enabled:
+                table, entry = table
+                profiler.phases.append(entry)
+            tables.append(table)
+    finally:
+        if pool is not None:
+            pool.terminate()
+    JobList = JobTable()
+    JobList.extend_many(tables)
+    return JobList
+
+
+# Drop the repeated records of jobs (see JobIndex.duplicates) from a table.
+# Returns the table of the remaining rows, its JobIndex and the number of
+# rows dropped.
+def deduplicate(table):
+    index = JobIndex(table)
+    duplicates = index.duplicates()
+    if len(duplicates) == 0:
+        return table, index, 0
+    keep = np.ones(len(table),dtype=bool)
+    keep[duplicates] = False
+    table = table.take(np.flatnonzero(keep))
+    return table, JobIndex(table), len(duplicates)
+
+
+# deduplicate() for the rows of a table from first on, which were appended
+# after the rest was deduplicated into index.  The first record of a job is
+# kept here, as the earlier rows may already have been counted.  The rows
+# before first keep their numbers.
+def deduplicate_appended(table,index,first):
+    columns = table.columns
+    keys = JobIndex.pack(columns['server'][first:],columns['job_id'][first:],\
+                         columns['array_index'][first:])
+    firsts = np.unique(keys,return_index=True)[1]
+    repeated = np.ones(len(keys),dtype=bool)
+    repeated[firsts] = False
+    keep = (keys < 0) | ~(repeated | np.in1d(keys,index.keys))
+    dropped = len(keep) - np.count_nonzero(keep)
+    if dropped > 0:
+        table = table.take(np.concatenate((np.arange(first),first + np.flatnonzero(keep))))
+    return table, JobIndex(table), dropped
@@ -0,0 +1,142 @@
+# Accounting files on disk: reading lines and chunks of plain and compressed
+# files, and picking the files a report needs by their names
+import os
+import time
+from jobstats.settings import seconds_per_day
+
+
+# Streaming decompressor of rotated accounting files with a suffix: a
+# function making a new object with decompress() and unused_data, which
+# holds the start of the next stream of a multi-stream file (pigz, pbzip2).
+# None when the module for the format is missing, and the file is piped
+# through its command-line tool instead.  The modules are only imported
+# once a compressed file turns up.
+def decompressor(suffix):
+    if suffix == '.gz':
+        import zlib
+        return lambda: zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if suffix == '.bz2':
+        import bz2
+        return bz2.BZ2Decompressor
+    if suffix == '.xz':
+        try:
+            import lzma
+        except ImportError:
+            try:
+                from backports import lzma
+            except ImportError:
+                return None
+        return lzma.LZMADecompressor
+    if suffix == '.zst':
+        try:
+            import zstandard
+        except ImportError:
+            return None
+        return lambda: zstandard.ZstdDecompressor().decompressobj()
+    return None
+
+# Command-line tools that write each format out decompressed
+decompress_commands = {'.gz':['gzip','-dc'],'.bz2':['bzip2','-dc'],\
+                       '.xz':['xz','-dc'],'.zst':['zstd','-dc']}
+# Bytes of compressed data read at a time
+compressed_read_size = 1 << 20
+
+
+# Suffix of a compressed accounting file, or None for a plain one
+def compression(datafile_name):
+    suffix = os.path.splitext(datafile_name)[1]
+    if suffix in decompress_commands:
+        return suffix
+    return None
+
+
+# The decompressed contents of a compressed accounting file, in chunks
+def decompressed_chunks(datafile_name):
+    suffix = compression(datafile_name)
+    new_decompressor = decompressor(suffix)
+    if new_decompressor is not None:
+        stream = new_decompressor()
+        datafile = open(datafile_name,"rb")
+        try:
+            while True:
+                data = datafile.read(compressed_read_size)
+                if not data:
+                    break
+                while data:
+                    chunk = stream.decompress(data)
+                    if chunk:
+                        yield chunk
+                    data = getattr(stream,'unused_data','')
+                    if data:
+                        stream = new_decompressor()
+        finally:
+            datafile.close()
+    else:
+        import subprocess
+        tool = subprocess.Popen(decompress_commands[suffix] + [datafile_name],\
+                                stdout=subprocess.PIPE,bufsize=compressed_read_size)
+        try:
+            while True:
+                chunk = tool.stdout.read(compressed_read_size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            tool.stdout.close()
+            if tool.wait() != 0:
+                raise IOError("%s failed on %s" % (decompress_commands[suffix][0],datafile_name))
+
+
+# The line of an accounting file that starts at byte offset (of the
+# decompressed data for a compressed file)
+def read_line(datafile_name,offset):
+    if compression(datafile_name) is None:
+        datafile = open(datafile_name,"r")
+        datafile.seek(offset)
+        line = datafile.readline()
+        datafile.close()
+        return line
+    position = 0
+    pieces = list()
+    for chunk in decompressed_chunks(datafile_name):
+        if position + len(chunk) > offset:
+            start = max(offset - position,0)
+            line_end = chunk.find("\n",start)
+            if line_end >= 0:
+                pieces.append(chunk[start:line_end + 1])
+                break
+            pieces.append(chunk[start:])
+        position += len(chunk)
+    return "".join(pieces)
+
+# Torque writes one accounting file per day, named YYYYMMDD.  Returns the
+# start of that day for a file named so (compressed or not), else None.
+def file_date(datafile_name):
+    name = os.path.basename(datafile_name)
+    if compression(name) is not None:
+        name = os.path.splitext(name)[0]
+    if len(name) != 8 or not name.isdigit():
+        return None
+    try:
+        return int(time.mktime(time.strptime(name,'%Y%m%d')))
+    except ValueError:
+        return None
+
+
+# The files that can hold the E records of jobs submitted in any of the
+# (label, start, end) windows.  A job ends, and so is logged, no earlier
+# than it was submitted, so days before a window are skipped; days after
+# it are read for slack_days more, for jobs that were submitted inside the
+# window but ended later.  Files not named by date are always read.
+def prune_files(file_names,windows,slack_days):
+    kept = list()
+    for datafile_name in file_names:
+        day = file_date(datafile_name)
+        if day is None:
+            kept.append(datafile_name)
+            continue
+        for label, start_t, end_t in windows:
+            if day + seconds_per_day > start_t and day <= end_t + slack_days*seconds_per_day:
+                kept.append(datafile_name)
+                break
+    return kept
@@ -0,0 +1,65 @@
+# Phase timings for --profile
+import contextlib
+import os
+import resource
+import sys
+import time
+
+# Peak resident set size of this process so far, in MB.  ru_maxrss is in kB
+# on Linux and in bytes on OS X.
+def peak_rss_mb(who=resource.RUSAGE_SELF):
+    peak = resource.getrusage(who).ru_maxrss
+    if sys.platform == 'darwin':
+        peak /= 1024
+    return peak / 1024.0
+
+
+# Resident set size of this process now, in MB, where /proc has it (the
+# peak so far elsewhere)
+def rss_mb():
+    try:
+        statm = open("/proc/self/statm").read().split()
+    except IOError:
+        return peak_rss_mb()
+    return int(statm[1]) * resource.getpagesize() / 2.0**20
+
+
+# Wall time, CPU time, records and peak memory of the phases of a run, for
+# --profile.  A phase is timed with "with profiler.phase(name) as entry:",
+# and the code inside sets entry['records'] to the number of records it
+# handled.  Phases can nest and are listed in the order they start.  A
+# disabled profiler records nothing.
+class PhaseProfiler:
+    def __init__(self,enabled=False):
+        self.enabled = enabled
+        self.phases  = list()
+
+    @contextlib.contextmanager
+    def phase(self,name):
+        entry = {'name':name,'records':None}
+        if not self.enabled:
+            yield entry
+            return
+        self.phases.append(entry)
+        wall = time.time()
+        cpu = sum(os.times()[:2])
+        try:
+            yield entry
+        finally:
+            entry['wall_seconds'] = time.time() - wall
+            entry['cpu_seconds'] = sum(os.times()[:2]) - cpu
+            entry['records_per_second'] = None
+            if entry['records'] is not None and entry['wall_seconds'] > 0:
+                entry['records_per_second'] = entry['records'] / entry['wall_seconds']
+            entry['peak_rss_mb'] = peak_rss_mb()
+
+    # The phases as one line of JSON
+    def trailer(self):
+        import json
+        return json.dumps({'profile':{'phases':self.phases,\
+                                      'peak_rss_mb':peak_rss_mb(),\
+                                      'children_peak_rss_mb':peak_rss_mb(resource.RUSAGE_CHILDREN)}},\
+                          sort_keys=True)
+
+# Phase timings of this run, enabled by --profile
+profiler = PhaseProfiler()
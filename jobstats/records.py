@@ -0,0 +1,309 @@
+# Decoding of accounting records: exec_host lists, GPU requests, whole
+# records (JobRecord) and the decoders of the fields the parser keeps
+from collections import namedtuple
+
+# A function wrapped in a bounded cache of its results.  Once maxsize
+# results are held, the least recently used one is dropped.
+class LRUCache:
+    def __init__(self,function,maxsize):
+        self.function = function
+        self.maxsize  = maxsize
+        self.hits     = 0
+        self.misses   = 0
+        self._entries = dict()
+        # Circular doubly linked list of [prev, next, key, result] links,
+        # most recently used first
+        self._root = []
+        self._root[:] = [self._root, self._root, None, None]
+
+    def __call__(self,key):
+        root = self._root
+        link = self._entries.get(key)
+        if link is not None:
+            self.hits += 1
+            prev, next = link[0], link[1]
+            prev[1] = next
+            next[0] = prev
+        else:
+            self.misses += 1
+            if len(self._entries) >= self.maxsize:
+                last = root[0]
+                last[0][1] = root
+                root[0] = last[0]
+                del self._entries[last[2]]
+            link = [None, None, key, self.function(key)]
+            self._entries[key] = link
+        first = root[1]
+        link[0] = root
+        link[1] = first
+        first[0] = link
+        root[1] = link
+        return link[3]
+
+    def clear(self):
+        self._entries.clear()
+        self._root[:] = [self._root, self._root, None, None]
+
+
+# Decoded exec_host list: the distinct hosts in order of first use, the
+# number of nodes and cores, and the cores used on each host.  multinode is
+# set when the list has more than one entry.
+ExecHost = namedtuple('ExecHost',('hosts','num_nodes','num_cores','multinode','cores'))
+
+def parse_exec_host(value):
+    hosts = list()
+    host_cores = dict()
+    total_cores = 0
+    fields = value.split('+')
+    for f in fields:
+        hostname,core_spec = f.split('/')
+        if hostname not in host_cores:
+            host_cores[hostname] = 0
+            hosts.append(intern(hostname))
+        cores = 0
+        if ("-" in core_spec) or ("," in core_spec):
+            for s in core_spec.split(","):
+                if ("-" in s):
+                    first,last = s.split("-")
+                    cores += int(last) - int(first) + 1
+                else:
+                    cores += 1
+        else:
+            cores += 1
+        host_cores[hostname] += cores
+        total_cores += cores
+    return ExecHost(tuple(hosts),len(hosts),total_cores,len(fields) > 1,\
+                    tuple([host_cores[hostname] for hostname in hosts]))
+
+# Array jobs and repeated submissions land on the same layouts over and
+# over, so decoded exec_host strings are shared through a cache
+decode_exec_host = LRUCache(parse_exec_host,16384)
+
+
+# Total GPUs of a Resource_List.nodes request such as "2:ppn=8:gpus=2" or
+# "n10:ppn=4:gpus=4+n11:ppn=4".  The count before the first colon is a
+# number of nodes unless it is a host name.
+def requested_gpus(value):
+    total = 0
+    for spec in value.split('+'):
+        fields = spec.split(':')
+        count = 1
+        if fields[0].isdigit():
+            count = int(fields[0])
+        for f in fields[1:]:
+            if f.startswith("gpus="):
+                total += count * int(f[5:])
+    return total
+
+
+# Job number, array index (-1 outside a job array) and server of a full job
+# ID such as "1664357[90].clusman0.localdomain".  The number is -1 when it
+# can't be read.
+def parse_job_id(full_ID):
+    ID, dot, server = full_ID.partition('.')
+    array_index = -1
+    bracket = ID.find('[')
+    if bracket >= 0:
+        index = ID[bracket + 1:ID.find(']',bracket)]
+        if index.isdigit():
+            array_index = int(index)
+        ID = ID[:bracket]
+    if not ID.isdigit():
+        return -1, array_index, server
+    return int(ID), array_index, server
+
+
+# A fully decoded accounting record.  These are only kept long enough to be
+# copied into a JobTable (or to answer a detail query), never stored en masse.
+class JobRecord:
+    def __init__(self,data):
+        self.logtime      = data[0]
+        self.jobstate     = data[1]
+        self.full_ID      = data[2]
+        self.ID           = self.full_ID.split('.')[0]
+        self.job_id, self.array_index, self.server = parse_job_id(self.full_ID)
+        for item in data[3]:
+            if item.count('=') > 0:
+                key = item.split('=',1)[0]
+                value = item.split('=',1)[1]
+                if key == "user":
+                    self.user = value
+                elif key == "group":
+                    self.group = value
+                elif key == "jobname":
+                    self.jobname = value
+                elif key == "queue":
+                    self.queue = value
+                elif key == "ctime":
+                    self.ctime = int(value)
+                elif key == "qtime":
+                    self.qtime = int(value)
+                elif key == "etime":
+                    self.etime = int(value)
+                elif key == "start":
+                    self.start = int(value)
+                elif key == "owner":
+                    self.email = value
+                elif key == "exec_host":
+                    self.hosts = value
+                    exec_host = decode_exec_host(value)
+                    self.unique_hosts = exec_host.hosts
+                    self.multinode = exec_host.multinode
+                    self.num_nodes = exec_host.num_nodes
+                    self.num_cores = exec_host.num_cores
+                elif key == "Resource_List.ddisk":
+                    self.req_disk = value
+                elif key == "Resource_List.neednodes":
+                    self.req_numnodes = value
+                elif key == "Resource_List.nodes":
+                    self.gpus = requested_gpus(value)
+                    if "gpus" in value:
+                        fields = value.split(':')
+                        for f in fields:
+                            if "gpus" in f:
+                                self.gpu = int(f.split("=")[1])
+                elif key == "Resource_List.pmem":
+                    self.req_memory = value
+                    self.req_pmem_bytes = request_size_bytes(value)
+                elif key == "Resource_List.walltime":
+                    self.req_walltime = value
+                    self.req_walltime_secs = request_seconds(value)
+                elif key == "session":
+                    self.session_ID = value
+                elif key == "total_execution_slots":
+                    self.slots = int(value)
+                elif key == "unique_node_count":
+                    self.unique_nodes = int(value)
+                elif key == "end":
+                    self.end = int(value)
+                elif key == "Exit_status":
+                    self.exit_status = int(value)
+                elif key == "resources_used.walltime":
+                    self.walltime = value
+                    self.walltime_secs = hms_seconds(value)
+                elif key == "resources_used.cput":
+                    self.cpu = value
+                    self.cpu_secs = hms_seconds(value)
+                elif key == "resources_used.mem":
+                    self.pmem = value
+                    self.mem_bytes = size_bytes(value)
+                elif key == "resources_used.vmem":
+                    self.vmem = value
+                    self.vmem_bytes = size_bytes(value)
+
+        # Catch some bad data where start time = 0
+        self.start = max(self.start,self.etime)
+
+        self.runtime  = self.end - self.start
+        if self.runtime < 0: self.runtime = 0
+        self.waittime = self.start - self.etime
+        if self.waittime < 0: self.waittime = 0
+        self.holdtime = self.etime - self.qtime
+        if self.holdtime < 0: self.holdtime = 0
+
+        if self.exit_status == 0:
+            if not hasattr(self,'exec_host'):
+                self.exec_host = "unknown"
+            if not hasattr(self,'unique_nodes'):
+                self.unique_nodes = self.exec_host.count('+') + 1
+            if not hasattr(self,'hosts'):
+                self.hosts = "unknown"
+        else:
+            if not hasattr(self,'exec_hosts'):
+                self.exec_host = "unknown"
+            if not hasattr(self,'hosts'):
+                self.hosts = "failed"
+            if not hasattr(self,'cpu'):
+                self.cpu = "failed"
+                self.cpu_secs = 0
+
+        if not hasattr(self,'req_numnodes'):
+            self.req_numnodes = -999
+        if not hasattr(self,'gpus'):
+            self.gpus = 0
+        for name in ('mem_bytes','vmem_bytes','req_pmem_bytes','req_walltime_secs'):
+            if not hasattr(self,name):
+                setattr(self,name,0)
+
+
+# Seconds of an HH:MM:SS time such as resources_used.walltime
+def hms_seconds(value):
+    hours, mins, secs = value.split(':')
+    return 3600 * int(hours) + 60 * int(mins) + int(secs)
+
+
+# Bytes per unit of a Torque size such as "142300kb" or "2gb"; a "w" unit
+# is a word of 8 bytes
+size_units = {'':1,'b':1,'kb':1 << 10,'mb':1 << 20,'gb':1 << 30,'tb':1 << 40,\
+              'w':8,'kw':8 << 10,'mw':8 << 20,'gw':8 << 30,'tw':8 << 40}
+
+# Bytes of a Torque size, or 0 if it can't be read
+def size_bytes(value):
+    # Torque logs the memory jobs used in kb
+    if value[-2:] == 'kb' and value[:-2].isdigit():
+        return int(value[:-2]) << 10
+    digits = value.rstrip('bkmgtwBKMGTW')
+    unit = size_units.get(value[len(digits):].lower())
+    if unit is None or not digits.isdigit():
+        return 0
+    return int(digits) * unit
+
+# Seconds of a duration given as [[[DD:]HH:]MM:]SS, or 0 if it can't be read
+def duration_seconds(value):
+    fields = value.split(':')
+    if len(fields) > 4 or not all([field.isdigit() for field in fields]):
+        return 0
+    days, hours, mins, secs = [0] * (4 - len(fields)) + [int(field) for field in fields]
+    return ((days * 24 + hours) * 60 + mins) * 60 + secs
+
+# A function's results by argument, for arguments that take only a handful
+# of values.  A hit is a single dict lookup, much cheaper than an LRUCache;
+# when maxsize results are held they are all dropped.
+class ValueCache(dict):
+    def __init__(self,function,maxsize):
+        dict.__init__(self)
+        self.function = function
+        self.maxsize  = maxsize
+
+    def __missing__(self,key):
+        if len(self) >= self.maxsize:
+            self.clear()
+        result = self.function(key)
+        self[key] = result
+        return result
+
+# Requests are made from a handful of values ("2gb", "72:00:00"), so their
+# decoded values are kept; the memory a job used is nearly always different
+# and is decoded directly
+request_size_bytes = ValueCache(size_bytes,1024).__getitem__
+request_seconds = ValueCache(duration_seconds,1024).__getitem__
+
+
+# The keys of an E record that end up in a JobTable, as key -> (slot,
+# decoder).  Every other key is skipped without being decoded.
+record_slots = ('ctime','qtime','etime','start','end','unique_nodes','cpu_secs',\
+                'walltime_secs','user','group','queue','exec_host','exit_status','gpus',\
+                'mem_bytes','vmem_bytes','req_pmem_bytes','req_walltime_secs')
+record_decoders = {
+    "ctime":                   (0,int),
+    "qtime":                   (1,int),
+    "etime":                   (2,int),
+    "start":                   (3,int),
+    "end":                     (4,int),
+    "unique_node_count":       (5,int),
+    "resources_used.cput":     (6,hms_seconds),
+    "resources_used.walltime": (7,hms_seconds),
+    "user":                    (8,str),
+    "group":                   (9,str),
+    "queue":                   (10,str),
+    "exec_host":               (11,decode_exec_host),
+    "Exit_status":             (12,int),
+    "Resource_List.nodes":     (13,requested_gpus),
+    "resources_used.mem":      (14,size_bytes),
+    "resources_used.vmem":     (15,size_bytes),
+    "Resource_List.pmem":      (16,request_size_bytes),
+    "Resource_List.walltime":  (17,request_seconds),
+}
+# Values for keys a record doesn't have; unique_nodes defaults to 1 as in
+# JobRecord
+record_defaults = (0,0,0,0,0,1,0,0,"","","",None,None,0,0,0,0,0)
@@ -0,0 +1,437 @@
+# The summary report: its sections for one run (report_stats), kept up to
+# date while following the accounting files (LiveReport), and printed
+import os
+import sys
+import time
+from collections import OrderedDict
+import numpy as np
+from jobstats.aggregate import GroupedSummaryStats, grouped_window_stats, merge_grouped, \
+                               section_rows, selected_sections
+from jobstats.efficiency import print_efficiency
+from jobstats.ingest import deduplicate, deduplicate_appended, load_jobs, read_job_records
+from jobstats.logfiles import compression, decompress_commands, prune_files
+from jobstats.profiling import profiler
+from jobstats.rollup import rollup_report_stats
+from jobstats.settings import default_windows, report_windows, seconds_per_day
+from jobstats.stream import stream_report_stats
+from jobstats.summary import CombinedSummaryTable, SummaryStats
+from jobstats.usage import NodeIndex, print_backlog, print_node_jobs, print_node_usage, \
+                           print_utilization
+
+# SummaryStats for the report sections named in sections (every one when
+# None), as a dict of section name -> GroupedSummaryStats result.  names
+# (column -> list of names) limits the user, group and queue sections to
+# the names listed for their column.  rows (every job when None) restricts
+# the jobs counted.  indexes (section -> WindowIndex of all the section's
+# jobs) are used instead of building the window indexes, with rows None.
+def report_stats(JobList,windows,percentiles=False,sections=None,names=None,rows=None,\
+                 indexes=None):
+    result = dict()
+    selected = rows
+    for section, column, multinode, details in selected_sections(sections):
+        with profiler.phase("aggregate/" + section) as entry:
+            rows = section_rows(JobList,column,multinode,names,selected)
+            index = None
+            if indexes is not None:
+                index = indexes[section]
+            result[section] = GroupedSummaryStats(JobList,column,windows,rows,details,\
+                                                  percentiles,index)
+            entry['records'] = len(JobList) if rows is None else len(rows)
+    return result
+
+
+# The table the workers of server_report_stats() read; they get it when
+# the pool forks rather than through a pipe
+_partition_table = None
+
+def _server_report_stats(task):
+    server, windows, percentiles, sections, names = task
+    table = _partition_table
+    return report_stats(table,windows,percentiles,sections,names,table.rows('server',server))
+
+
+# report_stats() of the jobs of every server (Torque cluster) on its own,
+# with the servers shared out between workers processes, and of all jobs
+# merged from those.  Returns an OrderedDict of server name -> sections, in
+# order of first appearance, and the combined sections, which are the same
+# as report_stats() of the whole table.
+def server_report_stats(JobList,windows,workers=1,percentiles=False,sections=None,names=None):
+    global _partition_table
+    servers = list(JobList.names['server'])
+    tasks = [(server,windows,percentiles,sections,names) for server in servers]
+    _partition_table = JobList
+    try:
+        if workers > 1 and len(tasks) > 1:
+            import multiprocessing
+            pool = multiprocessing.Pool(min(workers,len(tasks)))
+            try:
+                partials = pool.map(_server_report_stats,tasks)
+            finally:
+                pool.terminate()
+        else:
+            partials = [_server_report_stats(task) for task in tasks]
+    finally:
+        _partition_table = None
+
+    combined = dict()
+    for section, column, multinode, details in selected_sections(sections):
+        present = set()
+        for partial in partials:
+            present.update(partial[section])
+        # Fresh totals in the order of the whole table, so the servers'
+        # own are left as they are
+        if column is None:
+            order = ["all"]
+        else:
+            order = [name for name in JobList.names[column] if name in present]
+        merged = OrderedDict([(name,[SummaryStats(name,label,start_t,end_t,percentiles) \
+                                     for (label,start_t,end_t) in windows]) \
+                              for name in order])
+        for partial in partials:
+            merge_grouped(merged,partial[section])
+        combined[section] = merged
+    return OrderedDict(zip(servers,partials)), combined
+
+
+# Print the sections report_stats() computed, in report order
+def print_report(sections):
+    if 'all' in sections:
+        print ("********************************************************************************")
+        print ("***************************** Summary for all jobs *****************************")
+        print ("********************************************************************************")
+        for i in sections['all']['all']:
+            i.print_info()
+            print ("")
+
+
+    if 'user' in sections:
+        print ("\n")
+        print ("********************************************************************************")
+        print ("******************************* Summary by user ********************************")
+        print ("********************************************************************************")
+        user_stats = sections['user']
+        for user in sorted(user_stats):
+            CombinedSummaryTable(user_stats[user],"User",False,False,True)
+
+    if 'group' in sections:
+        print ("\n")
+        print ("********************************************************************************")
+        print ("****************************** Summary by group ********************************")
+        print ("********************************************************************************")
+        group_stats = sections['group']
+        for group in group_stats:
+            CombinedSummaryTable(group_stats[group],"Group",True,False,True)
+
+
+    if 'queue' in sections:
+        print ("\n")
+        print ("********************************************************************************")
+        print ("****************************** Summary by queue ********************************")
+        print ("********************************************************************************")
+        queue_stats = sections['queue']
+        for queue in queue_stats:
+            CombinedSummaryTable(queue_stats[queue],"Queue",True,True,False)
+
+
+    if 'single' in sections:
+        print ("********************************************************************************")
+        print ("******************************* Single Node Jobs *******************************")
+        print ("********************************************************************************")
+        single_node_data = sections['single']['all']
+        for i in single_node_data:
+            i.print_info()
+            print("")
+        CombinedSummaryTable(single_node_data,"Single-node jobs",True,True,True)
+
+
+
+    if 'multi' in sections:
+        print ("********************************************************************************")
+        print ("******************************** Multi-Node Jobs *******************************")
+        print ("********************************************************************************")
+        multi_node_data = sections['multi']['all']
+        for i in multi_node_data:
+            i.print_info()
+            print("")
+        CombinedSummaryTable(multi_node_data,"Multiple-node jobs",True,True,True)
+
+
+# Report state for --follow.  New jobs are folded into the existing totals:
+# the fixed windows directly, the rolling windows through per-day buckets
+# (by ctime) that are merged when the report is drawn and dropped once they
+# fall out of the longest rolling window.  The jobs of the days a rolling
+# window starts or ends in are re-counted from the table, so the numbers
+# match a batch run over the same jobs.  sections and names select what is
+# kept as in report_stats().
+class LiveReport:
+    def __init__(self,JobList,now,windows=default_windows,percentiles=False,\
+                 sections=None,names=None):
+        self.table    = JobList
+        self.windows  = windows
+        self.percentiles = percentiles
+        self.sections = selected_sections(sections)
+        self.names    = names
+        self.fixed_windows = [(label,start_t,end_t) \
+                              for (label,start_t,end_t,rolling) in windows if not rolling]
+        self.fixed    = dict()
+        self.buckets  = dict()
+        self.day_rows = dict()
+        for section, column, multinode, details in self.sections:
+            self.fixed[section]   = OrderedDict()
+            self.buckets[section] = dict()
+        self.expire(now)
+        self.fold(np.arange(len(JobList)))
+
+    # Drop the buckets that no rolling window can reach any more
+    def expire(self,now):
+        furthest = [start_t for (label,start_t,end_t,rolling) in self.windows if rolling]
+        if len(furthest) == 0:
+            # No rolling windows, so no buckets are needed
+            self.first_day = np.iinfo(np.int64).max
+        else:
+            self.first_day = (now - max(furthest)) // seconds_per_day
+        for day in [day for day in self.day_rows if day < self.first_day]:
+            del self.day_rows[day]
+        for section in self.buckets:
+            for buckets in self.buckets[section].values():
+                for day in [day for day in buckets if day < self.first_day]:
+                    del buckets[day]
+
+    def _section_rows(self,rows,column,multinode):
+        return section_rows(self.table,column,multinode,self.names,rows)
+
+    # Add the jobs in rows (new rows of the table) to every total
+    def fold(self,rows):
+        table = self.table
+        day_of_row = table.columns['ctime'][rows] // seconds_per_day
+        days = np.unique(day_of_row)
+        days = days[days >= self.first_day].tolist()
+        day_windows = [(str(day),day*seconds_per_day,(day+1)*seconds_per_day - 1) \
+                       for day in days]
+        for day in days:
+            new = rows[day_of_row == day]
+            if day in self.day_rows:
+                new = np.concatenate((self.day_rows[day],new))
+            self.day_rows[day] = new
+
+        for section, column, multinode, details in self.sections:
+            selected = self._section_rows(rows,column,multinode)
+            merge_grouped(self.fixed[section],\
+                          GroupedSummaryStats(table,column,self.fixed_windows,selected,\
+                                              details,self.percentiles))
+            codes, names = table.grouping(column)
+            buckets = self.buckets[section]
+            for code, w, stats in grouped_window_stats(table,column,day_windows,\
+                                                       selected,details,\
+                                                       self.percentiles):
+                name_buckets = buckets.setdefault(names[code],dict())
+                if days[w] in name_buckets:
+                    name_buckets[days[w]].merge(stats)
+                else:
+                    name_buckets[days[w]] = stats
+
+    # Report sections for the windows at time now, in the same form as
+    # report_stats()
+    def report(self,now):
+        self.expire(now)
+        table = self.table
+        windows = report_windows(now,self.windows)
+        rolling = [w for w, window in enumerate(self.windows) if window[3]]
+        sections = dict()
+        for section, column, multinode, details in self.sections:
+            result = OrderedDict()
+            for name, fixed in self.fixed[section].items():
+                fixed = iter(fixed)
+                stats_list = list()
+                for (label,start_t,end_t), window in zip(windows,self.windows):
+                    if window[3]:
+                        stats_list.append(SummaryStats(name,label,start_t,end_t,\
+                                                       self.percentiles))
+                    else:
+                        stats_list.append(fixed.next())
+                name_buckets = self.buckets[section].get(name,dict())
+                for day in sorted(name_buckets):
+                    day_start = day*seconds_per_day
+                    day_end = day_start + seconds_per_day - 1
+                    for w in rolling:
+                        stats = stats_list[w]
+                        if day_start >= stats.start_t and day_end <= stats.end_t:
+                            stats.merge(name_buckets[day])
+                result[name] = stats_list
+            # Days cut by the start or end of a rolling window
+            for w in rolling:
+                label, start_t, end_t = windows[w]
+                for day in set([start_t // seconds_per_day,end_t // seconds_per_day]):
+                    day_start = day*seconds_per_day
+                    if day_start >= start_t and day_start + seconds_per_day - 1 <= end_t:
+                        continue
+                    if day not in self.day_rows:
+                        continue
+                    rows = self._section_rows(self.day_rows[day],column,multinode)
+                    for name, stats_list in GroupedSummaryStats(table,column,\
+                            [windows[w]],rows,details,self.percentiles).items():
+                        result[name][w].merge(stats_list[0])
+            sections[section] = result
+        return sections
+
+
+# Keep reporting as the server appends to its accounting files.  Every file
+# but the newest is loaded once (through the cache); the newest file and any
+# file that appears later are read incrementally from the last offset.
+def follow(data_dir,interval,workers=1,cache_dir=None,rebuild=False,\
+           windows=default_windows,percentiles=False,utilization=None,utilization_by=None,\
+           backlog=None,backlog_by='queue',efficiency=(),slack_days=None,sections=None,\
+           names=None):
+    file_names = sorted([data_dir + "/" + filename for filename in os.listdir(data_dir)])
+    history = file_names[:-1]
+    if slack_days is not None:
+        # Rolling windows only move forward, so what is outside them now
+        # stays outside
+        history = prune_files(history,report_windows(int(time.time()),windows),slack_days)
+    print ("Importing job accounting data ... "),
+    JobList, index, dropped = deduplicate(load_jobs(history,workers,cache_dir,rebuild))
+    print("done")
+    if dropped > 0:
+        print ("Dropped %d duplicate job records") % dropped
+    live = LiveReport(JobList,int(time.time()),windows,percentiles,sections,names)
+    offsets = dict()
+    for datafile_name in file_names[-1:]:
+        offsets[datafile_name] = 0
+    while True:
+        present = set([data_dir + "/" + filename for filename in os.listdir(data_dir)])
+        # A file that is compressed by log rotation goes on from the same
+        # offset in its compressed copy
+        for datafile_name in [name for name in offsets if name not in present]:
+            offset = offsets.pop(datafile_name)
+            for suffix in sorted(decompress_commands):
+                if datafile_name + suffix in present:
+                    offsets[datafile_name + suffix] = offset
+        for datafile_name in sorted(present):
+            if datafile_name not in offsets and datafile_name not in file_names:
+                base, suffix = os.path.splitext(datafile_name)
+                if suffix in decompress_commands and base in offsets:
+                    # Still being compressed; picked up once the original goes
+                    continue
+                offsets[datafile_name] = 0
+        first_new = len(JobList)
+        for datafile_name in sorted(offsets):
+            if compression(datafile_name) is not None:
+                # Compressed files don't grow, so the rest is read once
+                table, end = read_job_records(datafile_name,offsets.pop(datafile_name))
+                file_names.append(datafile_name)
+                JobList.extend(table)
+            elif os.path.getsize(datafile_name) > offsets[datafile_name]:
+                table, offsets[datafile_name] = \
+                    read_job_records(datafile_name,offsets[datafile_name],True)
+                JobList.extend(table)
+        JobList, index, dropped = deduplicate_appended(JobList,index,first_new)
+        if dropped > 0:
+            print ("Dropped %d duplicate job records") % dropped
+        live.table = JobList
+        live.fold(np.arange(first_new,len(JobList)))
+
+        now = int(time.time())
+        print ("Report at %s (%d jobs)\n") % (time.ctime(now),len(JobList))
+        print_report(live.report(now))
+        if utilization is not None:
+            print_utilization(JobList,report_windows(now,windows),utilization,utilization_by)
+        if backlog is not None:
+            print_backlog(JobList,report_windows(now,windows),backlog,backlog_by)
+        for column in efficiency:
+            print_efficiency(JobList,report_windows(now,windows),column)
+        sys.stdout.flush()
+        time.sleep(interval)
+
+
+# One report over the files in data_dir.  With slack_days set, only the
+# files dated inside the report windows (or up to slack_days after one) are
+# read.  sections and names select the summary as in report_stats().
+def batch_report(args,data_dir,workers,cache_dir,report_windows_spec,slack_days=None,\
+                 sections=None,names=None):
+    file_list = os.listdir(data_dir)
+    num_files = len(file_list)
+    print ("Found %d files in the following directory: %s") % (num_files,data_dir)
+
+    windows = report_windows(int(time.mktime(time.localtime())),report_windows_spec)
+    file_names = [data_dir + "/" + filename for filename in file_list]
+    if slack_days is not None:
+        # Node queries can reach outside the report windows
+        file_names = prune_files(file_names,windows + [(name,start_t,end_t) \
+                                 for name, start_t, end_t in args.node or ()],slack_days)
+        if len(file_names) < num_files:
+            print ("Skipping %d files dated outside the report windows") % \
+                  (num_files - len(file_names))
+
+    # Get ALL the data on completed jobs
+    print ("Importing job accounting data ... "),
+    if args.memory_budget is not None:
+        # Fold the files into the sections a chunk at a time instead
+        summary, records, dropped = stream_report_stats(file_names,windows,args.memory_budget,\
+                                                        workers,cache_dir,args.rebuild_cache,\
+                                                        args.percentiles,sections,names)
+        print("done")
+        if dropped > 0:
+            print ("Dropped %d duplicate job records") % dropped
+        with profiler.phase("render"):
+            print_report(summary)
+        return
+
+    with profiler.phase("ingest") as entry:
+        JobList, index, dropped = deduplicate(load_jobs(file_names,workers,cache_dir,\
+                                                        args.rebuild_cache))
+        entry['records'] = len(JobList)
+    print("done")
+    if dropped > 0:
+        print ("Dropped %d duplicate job records") % dropped
+
+    with profiler.phase("aggregate") as entry:
+        # The jobs of a few chosen names are quicker to count directly than
+        # to load the rollup for
+        if args.by_server:
+            servers, summary = server_report_stats(JobList,windows,workers,args.percentiles,\
+                                                   sections,names)
+        elif cache_dir is None or args.no_rollup or args.percentiles or names is not None:
+            summary = report_stats(JobList,windows,args.percentiles,sections,names)
+        else:
+            summary = rollup_report_stats(JobList,windows,os.path.join(cache_dir,"rollup"),\
+                                          args.rebuild_cache,sections,names)
+        entry['records'] = len(JobList)
+    with profiler.phase("render"):
+        if args.by_server:
+            for server, server_summary in servers.items():
+                print ("********************************************************************************")
+                print ((" Server %s " % server).center(80,'*'))
+                print ("********************************************************************************")
+                print_report(server_summary)
+                print ("\n")
+            print ("********************************************************************************")
+            print (" All servers ".center(80,'*'))
+            print ("********************************************************************************")
+        print_report(summary)
+    if args.utilization is not None:
+        with profiler.phase("utilization") as entry:
+            print_utilization(JobList,windows,args.utilization,args.utilization_by)
+            entry['records'] = len(JobList)
+    if args.backlog is not None:
+        with profiler.phase("backlog") as entry:
+            print_backlog(JobList,windows,args.backlog,args.backlog_by)
+            entry['records'] = len(JobList)
+    for column in args.efficiency or ():
+        with profiler.phase("efficiency/" + column) as entry:
+            print_efficiency(JobList,windows,column)
+            entry['records'] = len(JobList)
+    if args.busiest_nodes is not None or args.idle_nodes or args.node:
+        with profiler.phase("nodes") as entry:
+            nodes = NodeIndex(JobList)
+            if args.busiest_nodes is not None or args.idle_nodes:
+                print_node_usage(nodes,windows,args.busiest_nodes,args.idle_nodes)
+            for name, start_t, end_t in args.node or ():
+                print_node_jobs(JobList,nodes,name,start_t,end_t)
+            entry['records'] = len(nodes.rows)
+    for job_id in args.jobs or ():
+        rows = index.lookup(job_id)
+        if len(rows) == 0:
+            print ("No job %s in the accounting data") % job_id
+        for row in rows:
+            print ("")
+            JobList[row].print_info()
@@ -0,0 +1,306 @@
+# Daily rollup cube of the report sections, kept under the cache directory
+import ast
+import hashlib
+import os
+import shutil
+from collections import OrderedDict
+import numpy as np
+from jobstats.aggregate import grouped_window_stats, section_rows, segment_reduce, \
+                               selected_sections
+from jobstats.ingest import cache_key
+from jobstats.profiling import profiler
+from jobstats.settings import seconds_per_day
+from jobstats.summary import SummaryStats
+
+# Daily rollup of the jobs of JobTables: one cell per (source file, day of
+# ctime, user, group, queue, multinode) with the job count, the sum, min and
+# max of every SummaryStats metric and the CPU seconds.  A report window is
+# answered by adding up the cells of the whole days inside it; only the jobs
+# of the days a window starts or ends in are counted one by one.  Cells are
+# kept per source file, so when a file changes (today's file grows) just
+# its cells are rebuilt, and the cube is saved under the cache directory.
+class RollupCube:
+    categories  = ('user','group','queue')
+    key_columns = ('source','day','user','group','queue','multinode')
+
+    def __init__(self):
+        self.files = list()
+        self.file_keys = dict()
+        self._file_codes = dict()
+        self.names = dict()
+        self.codes = dict()
+        for column in self.categories:
+            self.names[column] = list()
+            self.codes[column] = dict()
+        self.cells = dict()
+        for column in self.cell_columns():
+            self.cells[column] = np.zeros(0,dtype=np.int64)
+        self.cells['multinode'] = np.zeros(0,dtype=bool)
+
+    @classmethod
+    def cell_columns(cls):
+        return cls.key_columns + ('count','cpu') + \
+               tuple([metric + suffix for metric in SummaryStats.metrics \
+                      for suffix in ('_sum','_min','_max')])
+
+    def __len__(self):
+        return len(self.cells['count'])
+
+    def intern(self,column,name):
+        codes = self.codes[column]
+        code = codes.get(name)
+        if code is None:
+            code = len(codes)
+            codes[name] = code
+            self.names[column].append(name)
+        return code
+
+    def file_code(self,filename):
+        source = self._file_codes.get(filename)
+        if source is None:
+            source = len(self.files)
+            self._file_codes[filename] = source
+            self.files.append(filename)
+        return source
+
+    # Cells of the given rows of a table
+    def _cells_from_rows(self,table,rows):
+        columns = table.columns
+        if len(rows) == 0:
+            return dict([(column,values[:0]) for column, values in self.cells.items()])
+        keys = dict()
+        files = np.array([self.file_code(filename) for filename in table.files],dtype=np.int64)
+        keys['source'] = files[columns['source'][rows]]
+        keys['day'] = columns['ctime'][rows] // seconds_per_day
+        for column in self.categories:
+            remap = np.array([self.intern(column,name) for name in table.names[column]],\
+                             dtype=np.int64)
+            keys[column] = remap[columns[column][rows]]
+        keys['multinode'] = columns['multinode'][rows]
+        order = np.lexsort([keys[column] for column in reversed(self.key_columns)])
+        changes = np.zeros(len(rows) - 1,dtype=bool)
+        for column in self.key_columns:
+            keys[column] = keys[column][order]
+            changes |= keys[column][1:] != keys[column][:-1]
+        starts = np.concatenate(([0],np.flatnonzero(changes) + 1))
+        cells = dict()
+        for column in self.key_columns:
+            cells[column] = keys[column][starts]
+        cells['count'] = np.diff(np.concatenate((starts,[len(rows)]))).astype(np.int64)
+        cells['cpu'] = np.add.reduceat(columns['cpu_secs'][rows][order],starts)
+        wait = np.maximum(columns['start'] - columns['etime'],0)[rows][order]
+        run = np.maximum(columns['end'] - columns['start'],0)[rows][order]
+        values = {'wait':wait,'run':run,'turnaround':wait + run,\
+                  'cores':columns['num_cores'][rows][order],\
+                  'nodes':columns['unique_nodes'][rows][order]}
+        for metric in SummaryStats.metrics:
+            v = values[metric]
+            cells[metric + '_sum'] = np.add.reduceat(v,starts)
+            cells[metric + '_min'] = np.minimum.reduceat(v,starts)
+            cells[metric + '_max'] = np.maximum.reduceat(v,starts)
+        return cells
+
+    # Rebuild the cells of every file of table that is new or has changed
+    # since it was rolled up, or whose rows kept by deduplication have.
+    # Returns True if anything changed.
+    def update(self,table):
+        changed = list()
+        order = np.argsort(table.columns['source'],kind='mergesort')
+        bounds = np.searchsorted(table.columns['source'][order],np.arange(len(table.files) + 1))
+        offsets = table.columns['offset'][order]
+        for code, datafile_name in enumerate(table.files):
+            kept = hashlib.sha1(offsets[bounds[code]:bounds[code + 1]].tostring()).hexdigest()
+            key = cache_key(datafile_name) + (kept,)
+            if self.file_keys.get(datafile_name) != key:
+                self.file_keys[datafile_name] = key
+                changed.append(code)
+        if len(changed) == 0:
+            return False
+        stale = np.array([self.file_code(table.files[code]) for code in changed],dtype=np.int64)
+        keep = ~np.in1d(self.cells['source'],stale)
+        rows = np.flatnonzero(np.in1d(table.columns['source'],changed))
+        new = self._cells_from_rows(table,rows)
+        for column in self.cells:
+            self.cells[column] = np.concatenate((self.cells[column][keep],new[column]))
+        return True
+
+    # Drop the cells of files that no longer exist and write the cube to a
+    # directory, replacing it atomically
+    def save(self,directory):
+        gone = [self._file_codes[filename] for filename in self.files \
+                if not os.path.exists(filename)]
+        if len(gone) > 0:
+            keep = ~np.in1d(self.cells['source'],gone)
+            for column in self.cells:
+                self.cells[column] = self.cells[column][keep]
+            for code in gone:
+                self.file_keys.pop(self.files[code],None)
+        tmp = "%s.tmp%d" % (directory,os.getpid())
+        if os.path.isdir(tmp):
+            shutil.rmtree(tmp)
+        os.makedirs(tmp)
+        for column, values in self.cells.items():
+            np.save(os.path.join(tmp,column + ".npy"),values)
+        for column in self.categories:
+            np.save(os.path.join(tmp,column + ".names.npy"),\
+                    np.array(self.names[column],dtype=str))
+        np.save(os.path.join(tmp,"files.npy"),np.array(self.files,dtype=str))
+        # The keys are written last and mark the cube as complete
+        keyfile = open(os.path.join(tmp,"keys"),"w")
+        keyfile.write(repr(self.file_keys))
+        keyfile.close()
+        if os.path.isdir(directory):
+            shutil.rmtree(directory)
+        os.rename(tmp,directory)
+
+    # A cube written by save(), or None if there is no complete one
+    @classmethod
+    def load(cls,directory):
+        try:
+            keyfile = open(os.path.join(directory,"keys"),"r")
+            keys = ast.literal_eval(keyfile.read())
+            keyfile.close()
+        except (IOError,SyntaxError,ValueError):
+            return None
+        cube = cls()
+        for column in cube.cells:
+            cube.cells[column] = np.load(os.path.join(directory,column + ".npy"))
+        for column in cube.categories:
+            for name in np.load(os.path.join(directory,column + ".names.npy")).tolist():
+                cube.intern(column,name)
+        for filename in np.load(os.path.join(directory,"files.npy")).tolist():
+            cube.file_code(filename)
+        cube.file_keys = keys
+        return cube
+
+    # Add the cells idx to the SummaryStats of the windows whose whole days
+    # run from days[w][0] to days[w][1].  codes gives the name (an index into
+    # names) of every cell.  As in WindowIndex, the cells are sorted by
+    # (name, day) so that every (name, window) pair is one range of them.
+    def _add_cells(self,result,names,codes,idx,days,details):
+        cells = self.cells
+        idx = idx[np.lexsort((cells['day'][idx],codes[idx]))]
+        cell_codes = codes[idx]
+        keys = (cell_codes << 32) + cells['day'][idx]
+        present = np.unique(cell_codes)
+        base = (present << 32)[:,np.newaxis]
+        lo = np.searchsorted(keys,base + np.array([first for first, last in days]),'left')
+        hi = np.searchsorted(keys,base + np.array([last for first, last in days]),'right')
+        lo = lo.ravel()
+        hi = np.maximum(hi.ravel(),lo)
+        nonempty = np.flatnonzero(hi > lo)
+        lo = lo[nonempty]
+        hi = hi[nonempty]
+        totals = dict()
+        for column in ('count','cpu') + tuple([metric + '_sum' for metric in SummaryStats.metrics]):
+            prefix = np.concatenate(([0],np.cumsum(cells[column][idx])))
+            totals[column] = prefix[hi] - prefix[lo]
+        for metric in SummaryStats.metrics:
+            totals[metric + '_min'] = segment_reduce(np.minimum,cells[metric + '_min'][idx],\
+                                                     lo,hi,np.iinfo(np.int64).max)
+            totals[metric + '_max'] = segment_reduce(np.maximum,cells[metric + '_max'][idx],\
+                                                     lo,hi,np.iinfo(np.int64).min)
+        targets = list()
+        for q, query in enumerate(nonempty):
+            p, w = divmod(int(query),len(days))
+            stats = result[names[present[p]]][w]
+            stats._add_values(int(totals['count'][q]),\
+                              [(int(totals[metric + '_sum'][q]),\
+                                int(totals[metric + '_min'][q]),\
+                                int(totals[metric + '_max'][q])) \
+                               for metric in SummaryStats.metrics])
+            targets.append(stats)
+
+        # Job count and CPU time per user/group/queue inside every window
+        if len(details) == 0 or len(lo) == 0:
+            return
+        lengths = hi - lo
+        offsets = np.cumsum(lengths) - lengths
+        positions = idx[np.repeat(lo - offsets,lengths) + np.arange(lengths.sum())]
+        queries = np.repeat(np.arange(len(lo)),lengths)
+        for detail, kind in (('user','users'),('group','groups'),('queue','queues')):
+            if kind not in details:
+                continue
+            detail_names = self.names[detail]
+            keys = queries * len(detail_names) + cells[detail][positions]
+            order = np.argsort(keys,kind='mergesort')
+            keys = keys[order]
+            starts = np.concatenate(([0],np.flatnonzero(keys[1:] != keys[:-1]) + 1))
+            jobs = np.add.reduceat(cells['count'][positions][order],starts)
+            cpu = np.add.reduceat(cells['cpu'][positions][order],starts)
+            for e, key in enumerate(keys[starts]):
+                q, code = divmod(int(key),len(detail_names))
+                targets[q].add_usage(kind,detail_names[code],int(jobs[e]),int(cpu[e]))
+
+    # SummaryStats for the report sections, as report_stats() gives them for
+    # the same table: the cells of the table's files for the whole days of
+    # every window, plus the jobs of the days the window boundaries cut
+    def report_stats(self,table,windows,sections=None,names=None):
+        cells = self.cells
+        in_run = np.zeros(len(self.files),dtype=bool)
+        for filename in table.files:
+            in_run[self.file_code(filename)] = True
+        active = in_run[cells['source']]
+        ctime = table.columns['ctime']
+        whole_days = list()
+        cut_rows = list()
+        for label, start_t, end_t in windows:
+            first_day = -(-start_t // seconds_per_day)
+            last_day = (end_t + 1) // seconds_per_day - 1
+            whole_days.append((first_day,last_day))
+            if first_day > last_day:
+                cut = (ctime >= start_t) & (ctime <= end_t)
+            else:
+                cut = ((ctime >= start_t) & (ctime < first_day * seconds_per_day)) | \
+                      ((ctime >= (last_day + 1) * seconds_per_day) & (ctime <= end_t))
+            cut_rows.append(np.flatnonzero(cut))
+
+        result = dict()
+        for section, column, multinode, details in selected_sections(sections):
+            with profiler.phase("aggregate/" + section) as entry:
+                codes, all_names = table.grouping(column)
+                section_names = all_names
+                selected = active
+                if column is None:
+                    cell_codes = np.zeros(len(self),dtype=np.int64)
+                else:
+                    remap = np.array([table.codes[column].get(name,-1) \
+                                      for name in self.names[column]] + [-1],dtype=np.int64)
+                    cell_codes = remap[cells[column]]
+                    if names is not None and names.get(column) is not None:
+                        chosen = set(names[column])
+                        section_names = [name for name in section_names if name in chosen]
+                        selected = selected & np.in1d(cell_codes,\
+                            [table.codes[column][name] for name in section_names])
+                if multinode is not None:
+                    selected = selected & (cells['multinode'] == multinode)
+                stats = OrderedDict()
+                for name in section_names:
+                    stats[name] = [SummaryStats(name,label,start_t,end_t) \
+                                   for (label,start_t,end_t) in windows]
+                if len(windows) > 0:
+                    self._add_cells(stats,all_names,cell_codes,np.flatnonzero(selected),\
+                                    whole_days,details)
+                for w, window in enumerate(windows):
+                    rows = section_rows(table,column,multinode,names,cut_rows[w])
+                    for code, w0, window_stats in grouped_window_stats(table,column,[window],\
+                                                                       rows,details):
+                        stats[all_names[code]][w].merge(window_stats)
+                result[section] = stats
+                entry['records'] = int(cells['count'][selected].sum())
+        return result
+
+
+# Report sections from the rollup cube in directory, which is brought up to
+# date with the files of JobList first (or rebuilt from scratch)
+def rollup_report_stats(JobList,windows,directory,rebuild=False,sections=None,names=None):
+    with profiler.phase("rollup") as entry:
+        cube = None
+        if not rebuild:
+            cube = RollupCube.load(directory)
+        if cube is None:
+            cube = RollupCube()
+        if cube.update(JobList):
+            cube.save(directory)
+        entry['records'] = len(cube)
+    return cube.report_stats(JobList,windows,sections,names)
@@ -0,0 +1,288 @@
+# Resident query server.  The job table is loaded once and the window
+# indexes of the report sections are kept, so a report query costs a few
+# binary searches instead of a reread of the archive.  Queries come over
+# HTTP, on localhost or a Unix socket:
+#
+#   /report?section=user&user=NAME&last=60&format=json
+#   /status
+#   /reload             (also done whenever the files in the data directory change)
+#
+# /report takes the selection and window options of the command line as
+# parameters (section, user, group, queue, last, weeks, year, window,
+# percentiles) and answers with the printed report or, with format=json,
+# its numbers.
+import BaseHTTPServer
+import SocketServer
+import StringIO
+import argparse
+import json
+import os
+import signal
+import stat
+import sys
+import traceback
+import threading
+import time
+import urlparse
+from collections import OrderedDict
+from jobstats.aggregate import WindowIndex, section_rows
+from jobstats.cli import last_days_window, range_window, report_selection, weeks_windows, \
+                         year_window
+from jobstats.ingest import deduplicate, load_jobs
+from jobstats.report import print_report, report_stats
+from jobstats.settings import default_windows, report_sections, report_windows
+
+
+class QueryError(Exception):
+    pass
+
+
+# Size and modification time of every file in a directory
+def directory_state(data_dir):
+    state = dict()
+    for filename in os.listdir(data_dir):
+        info = os.stat(os.path.join(data_dir,filename))
+        state[filename] = (info.st_size,info.st_mtime)
+    return state
+
+
+# The jobs of the files in a directory as they were when loaded, with the
+# window index of each report section, built the first time it is asked
+# for.  Queries only read a snapshot; a reload builds a new one.
+class Snapshot:
+    def __init__(self,data_dir,workers=1,cache_dir=None,rebuild=False):
+        self.files = directory_state(data_dir)
+        # In the order batch_report() reads them, which sets the order of names
+        file_names = [data_dir + "/" + filename for filename in os.listdir(data_dir) \
+                      if filename in self.files]
+        self.table, self.index, self.dropped = deduplicate(load_jobs(file_names,workers,\
+                                                                     cache_dir,rebuild))
+        self.loaded = time.time()
+        self._indexes = dict()
+        self._lock = threading.Lock()
+
+    # section -> WindowIndex of all its jobs, for the sections given
+    def indexes(self,sections):
+        with self._lock:
+            for section, column, multinode, details in report_sections:
+                if section in sections and section not in self._indexes:
+                    self._indexes[section] = WindowIndex(self.table,column,\
+                                                         section_rows(self.table,column,\
+                                                                      multinode))
+            return dict(self._indexes)
+
+    def status(self):
+        return OrderedDict([('jobs',len(self.table)),('files',len(self.files)),\
+                            ('duplicates_dropped',self.dropped),('loaded',int(self.loaded)),\
+                            ('indexed_sections',sorted(self._indexes))])
+
+
+# sys.stdout for a threaded server: what a thread prints while it captures
+# goes to its own buffer, everything else to the real stream
+class ThreadOutput(object):
+    def __init__(self,stream):
+        self.stream = stream
+        self.local  = threading.local()
+
+    def write(self,text):
+        getattr(self.local,'buffer',self.stream).write(text)
+
+    def flush(self):
+        getattr(self.local,'buffer',self.stream).flush()
+
+    # The space a "print x," leaves pending is per thread too
+    @property
+    def softspace(self):
+        return getattr(self.local,'buffer',self.stream).softspace
+
+    @softspace.setter
+    def softspace(self,value):
+        getattr(self.local,'buffer',self.stream).softspace = value
+
+    # What function(*args) prints
+    def capture(self,function,*args):
+        self.local.buffer = StringIO.StringIO()
+        try:
+            function(*args)
+            return self.local.buffer.getvalue()
+        finally:
+            del self.local.buffer
+
+
+def stats_json(stats):
+    entry = OrderedDict([('window',stats.label),('start',stats.start_t),('end',stats.end_t),\
+                         ('jobs',stats.num_jobs)])
+    for metric in stats.metrics:
+        low, high, average = getattr(stats,metric)
+        entry[metric] = OrderedDict([('min',float(low)),('max',float(high)),\
+                                     ('avg',float(average))])
+    if stats.sketches is not None:
+        entry['percentiles'] = OrderedDict([(metric,OrderedDict(zip(\
+            ["p%d" % p for p in stats.percentile_points],\
+            [float(value) for value in stats.percentiles(metric)]))) \
+            for metric in stats.percentile_metrics])
+    for kind in stats.details:
+        entry[kind] = [OrderedDict([('name',name),('jobs',jobs),('cpu_secs',cpu)]) \
+                       for name, jobs, cpu in getattr(stats,kind)]
+    return entry
+
+
+# The report of the snapshot in use for the parameters of a /report query,
+# as (content type, body)
+class Queries:
+    window_parsers = (('last',last_days_window),('weeks',weeks_windows),\
+                      ('year',year_window),('window',range_window))
+
+    def __init__(self,data_dir,workers=1,cache_dir=None):
+        self.data_dir  = data_dir
+        self.workers   = workers
+        self.cache_dir = cache_dir
+        self.output    = None
+        self.snapshot  = None
+        self._reload_lock = threading.Lock()
+
+    # Load the files again if they have changed since the snapshot in use
+    # was taken (or always, with force set).  Queries go on against the
+    # old snapshot until the new one is ready.
+    def reload(self,force=False):
+        with self._reload_lock:
+            if force or self.snapshot is None or \
+               directory_state(self.data_dir) != self.snapshot.files:
+                snapshot = Snapshot(self.data_dir,self.workers,self.cache_dir)
+                snapshot.indexes([entry[0] for entry in report_sections])
+                self.snapshot = snapshot
+                return True
+            return False
+
+    def windows(self,query):
+        windows = list()
+        for name, parse in self.window_parsers:
+            for value in query.get(name,()):
+                try:
+                    windows.extend(parse(value))
+                except (argparse.ArgumentTypeError,ValueError) as error:
+                    raise QueryError("%s=%s: %s" % (name,value,error))
+        return windows or default_windows
+
+    def report(self,query):
+        sections = query.get('section')
+        for section in sections or ():
+            if section not in [entry[0] for entry in report_sections]:
+                raise QueryError("no report section %r" % section)
+        sections, names = report_selection(argparse.Namespace(\
+            sections=sections,users=query.get('user'),groups=query.get('group'),\
+            queues=query.get('queue'),jobs=None))
+        percentiles = query.get('percentiles',['0'])[-1] not in ('','0','no','false')
+        windows = report_windows(int(time.time()),self.windows(query))
+        snapshot = self.snapshot
+        if sections is None:
+            sections = [entry[0] for entry in report_sections]
+        summary = report_stats(snapshot.table,windows,percentiles,sections,names,\
+                               indexes=snapshot.indexes(sections))
+        if query.get('format',['text'])[-1] == 'json':
+            body = OrderedDict()
+            for section, column, multinode, details in report_sections:
+                if section in summary:
+                    body[section] = OrderedDict([(name,[stats_json(stats) for stats in stats_list]) \
+                                                 for name, stats_list in summary[section].items()])
+            return "application/json", json.dumps(body)
+        return "text/plain", self.output.capture(print_report,summary)
+
+
+class QueryHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    server_version = "jobstats"
+
+    def do_GET(self):
+        url = urlparse.urlparse(self.path)
+        query = urlparse.parse_qs(url.query,keep_blank_values=True)
+        queries = self.server.queries
+        status = 200
+        try:
+            if url.path == "/report":
+                content_type, body = queries.report(query)
+            elif url.path == "/status":
+                content_type, body = "application/json", json.dumps(queries.snapshot.status())
+            elif url.path == "/reload":
+                reloaded = queries.reload(force=True)
+                content_type = "application/json"
+                body = json.dumps(OrderedDict([('reloaded',reloaded)] + \
+                                              queries.snapshot.status().items()))
+            else:
+                status, content_type, body = 404, "text/plain", "No such query %s\n" % url.path
+        except QueryError as error:
+            status, content_type, body = 400, "text/plain", str(error) + "\n"
+        except Exception as error:
+            sys.stderr.write(traceback.format_exc())
+            status, content_type, body = 500, "text/plain", "%s: %s\n" % \
+                                         (error.__class__.__name__,error)
+        self.send_response(status)
+        self.send_header("Content-Type",content_type)
+        self.send_header("Content-Length",str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_POST = do_GET
+
+    # Unix socket clients have no address
+    def log_message(self,format,*args):
+        sys.stderr.write("%s %s\n" % (time.strftime("%Y-%m-%d %H:%M:%S"),format % args))
+
+
+# Connections past the listen backlog are refused at once on a Unix socket
+class TCPQueryServer(SocketServer.ThreadingMixIn,BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class UnixQueryServer(SocketServer.ThreadingMixIn,SocketServer.UnixStreamServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+# Serve queries on address, a (host, port) pair or the path of a Unix
+# socket; a socket left behind there by an earlier server is replaced.  Every poll_interval seconds (never with 0)
+# the data directory is checked for new or changed files.
+def serve(address,data_dir,workers=1,cache_dir=None,poll_interval=60):
+    queries = Queries(data_dir,workers,cache_dir)
+    print ("Importing job accounting data ... "),
+    sys.stdout.flush()
+    queries.reload()
+    print ("done (%d jobs)") % len(queries.snapshot.table)
+    queries.output = sys.stdout = ThreadOutput(sys.stdout)
+
+    if isinstance(address,tuple):
+        server = TCPQueryServer(address,QueryHandler)
+        address = "%s:%d" % address
+        socket_path = None
+    else:
+        if os.path.exists(address) and stat.S_ISSOCK(os.stat(address).st_mode):
+            os.remove(address)
+        server = UnixQueryServer(address,QueryHandler)
+        socket_path = address
+    server.queries = queries
+
+    if poll_interval > 0:
+        def poll():
+            while True:
+                time.sleep(poll_interval)
+                if queries.reload():
+                    print ("Reloaded %d jobs at %s") % (len(queries.snapshot.table),time.ctime())
+                    sys.stdout.flush()
+        poller = threading.Thread(target=poll)
+        poller.daemon = True
+        poller.start()
+
+    def terminate(signum,frame):
+        sys.exit(0)
+    signal.signal(signal.SIGTERM,terminate)
+
+    print ("Serving queries on %s") % address
+    sys.stdout.flush()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if socket_path is not None and os.path.exists(socket_path):
+            os.remove(socket_path)
@@ -0,0 +1,57 @@
+# Report windows, report sections and timeline bins: what the command line
+# chooses from.  Nothing here needs NumPy, so arguments are parsed before
+# the heavy modules are imported.
+import time
+
+# Set up some important dates
+# 2013
+start_2013_str = '2013.01.01 00:00:00'
+end_2013_str   = '2013.12.31 23:59:59'
+start_2013 = int(time.mktime(time.strptime(start_2013_str,'%Y.%m.%d %H:%M:%S')))
+end_2013   = int(time.mktime(time.strptime(end_2013_str,'%Y.%m.%d %H:%M:%S')))
+
+# 2014
+start_2014_str = '2014.01.01 00:00:00'
+end_2014_str   = '2014.12.31 23:59:59'
+start_2014 = int(time.mktime(time.strptime(start_2014_str,'%Y.%m.%d %H:%M:%S')))
+end_2014   = int(time.mktime(time.strptime(end_2014_str,'%Y.%m.%d %H:%M:%S')))
+
+# 2015
+start_2015_str = '2015.01.01 00:00:00'
+end_2015_str   = '2015.12.31 23:59:59'
+start_2015 = int(time.mktime(time.strptime(start_2015_str,'%Y.%m.%d %H:%M:%S')))
+end_2015   = int(time.mktime(time.strptime(end_2015_str,'%Y.%m.%d %H:%M:%S')))
+
+seconds_per_day = 60*60*24
+
+# Report windows as (label, start, end, rolling).  The start and end of a
+# rolling window are in seconds before the time of the report; the others
+# are absolute times.  Both ends are inclusive.
+default_windows = [("Past 30 days",30*seconds_per_day,0,True),
+                   ("Past 60 days",60*seconds_per_day,0,True),
+                   ("Past 90 days",90*seconds_per_day,0,True),
+                   ("2015",start_2015,end_2015,False),
+                   ("2014",start_2014,end_2014,False),
+                   ("2013",start_2013,end_2013,False)]
+
+# The (label, start, end) windows of a report drawn at time now
+def report_windows(now,windows=default_windows):
+    resolved = list()
+    for label, start_t, end_t, rolling in windows:
+        if rolling:
+            resolved.append((label,now - start_t,now - end_t))
+        else:
+            resolved.append((label,start_t,end_t))
+    return resolved
+
+# (name, grouping column, multinode filter, user/group/queue breakdowns
+# printed) of every report section
+report_sections = (('all',None,None,()),
+                   ('user','user',None,('queues',)),
+                   ('group','group',None,('users','queues')),
+                   ('queue','queue',None,('users','groups')),
+                   ('single',None,False,('users','groups','queues')),
+                   ('multi',None,True,('users','groups','queues')))
+
+# Bin sizes of the utilization timeline, as (seconds, label of a bin)
+utilization_bins = {'hour':(60*60,"Hourly"),'day':(seconds_per_day,"Daily")}
@@ -0,0 +1,172 @@
+# Reports over archives too large to hold in memory.  The accounting files
+# are read in chunks of about a fixed number of jobs; each chunk is folded
+# into the report sections and dropped, so memory use doesn't grow with the
+# number of files.
+import os
+import shutil
+import tempfile
+from collections import OrderedDict
+import numpy as np
+from jobstats.aggregate import GroupedSummaryStats, merge_grouped, section_rows, \
+                               selected_sections
+from jobstats.ingest import read_job_file
+from jobstats.profiling import profiler, rss_mb
+from jobstats.summary import SummaryStats
+from jobstats.table import JobIndex, JobTable
+
+# Rough peak memory per job of a chunk: its columns, the copies made when
+# its files are merged and the WindowIndex of a section over it
+row_bytes = 1024
+# Fewest jobs in a chunk, however little of the budget is left
+min_rows = 10000
+# Every sample_step-th key of each run is kept to split the keys into ranges
+sample_step = 64
+
+
+# Jobs that fit in what is left of a memory budget in MB.  The totals kept
+# so far are part of the process, so this is worked out for every chunk.
+def chunk_rows(budget_mb):
+    return max(int((budget_mb - rss_mb()) * 2**20) // row_bytes,min_rows)
+
+
+# The JobTables of the files, in order, as (row number of the first job,
+# table) chunks of about as many jobs as fit in budget_mb MB.  A file is
+# never split, so a chunk may be up to a file larger.
+def table_chunks(file_names,budget_mb,workers=1,cache_dir=None,rebuild=False):
+    pool = None
+    step = 1
+    if workers > 1 and len(file_names) > 1:
+        import multiprocessing
+        step = min(workers,len(file_names))
+        pool = multiprocessing.Pool(step)
+    first = 0
+    tables = list()
+    count = 0
+    rows = chunk_rows(budget_mb)
+    try:
+        for k in range(0,len(file_names),step):
+            tasks = [(datafile_name,cache_dir,rebuild) for datafile_name in file_names[k:k + step]]
+            if pool is None:
+                read = [read_job_file(task) for task in tasks]
+            else:
+                read = pool.map(read_job_file,tasks)
+            for table in read:
+                tables.append(table)
+                count += len(table)
+            if count >= rows or k + step >= len(file_names):
+                chunk = JobTable()
+                chunk.extend_many(tables)
+                yield first, chunk
+                # The caller has let go of the chunk, so what is left of the
+                # budget can be measured
+                chunk = None
+                first += count
+                tables = list()
+                count = 0
+                rows = chunk_rows(budget_mb)
+    finally:
+        if pool is not None:
+            pool.terminate()
+
+
+# Row numbers, counted over all the files in order, of the records
+# deduplicate() would drop from them, sorted.  Each chunk's (key, end, row)
+# triples are written sorted by key to a run file in workdir; the runs are
+# then read back one range of keys (of about a chunk of jobs) at a time, so
+# all the keys are never in memory at once.
+def duplicate_rows(file_names,budget_mb,workdir,workers=1,cache_dir=None,rebuild=False):
+    servers = dict()
+    runs = list()
+    samples = list()
+    for first, chunk in table_chunks(file_names,budget_mb,workers,cache_dir,rebuild):
+        columns = chunk.columns
+        codes = np.array([servers.setdefault(name,len(servers)) \
+                          for name in chunk.names['server']],dtype=np.int64)
+        keys = JobIndex.pack(codes[columns['server']],columns['job_id'],columns['array_index'])
+        valid = np.flatnonzero(keys >= 0)
+        order = valid[np.argsort(keys[valid],kind='mergesort')]
+        run = os.path.join(workdir,"run%d.npy" % len(runs))
+        np.save(run,np.vstack((keys[order],columns['end'][order],first + order)))
+        runs.append(run)
+        samples.append(keys[order][::sample_step])
+        del chunk
+    if len(runs) == 0:
+        return np.zeros(0,dtype=np.int64)
+
+    runs = [np.load(run,mmap_mode='r') for run in runs]
+    samples = np.sort(np.concatenate(samples))
+    per_range = max(chunk_rows(budget_mb) // sample_step,1)
+    starts = np.unique(samples[per_range::per_range])
+    # Where every range starts in every run, plus the end of the run
+    positions = [np.concatenate((np.searchsorted(run[0],starts),[run.shape[1]])) for run in runs]
+    dropped = list()
+    for r in range(len(starts) + 1):
+        lo = [0 if r == 0 else position[r - 1] for position in positions]
+        keys, end, row = np.hstack([run[:,a:b] for run, a, b in \
+                                    zip(runs,lo,[position[r] for position in positions])])
+        # As in JobIndex.duplicates(), the latest end and then the last row
+        # read are kept
+        order = np.lexsort((row,end,keys))
+        keys = keys[order]
+        kept = np.concatenate((keys[1:] != keys[:-1],[True]))
+        dropped.append(row[order][~kept])
+    return np.sort(np.concatenate(dropped))
+
+
+# report_stats() over the files, reading them in chunks that fit in about
+# budget_mb MB.  The files are read twice, the first time to find the
+# duplicate records; without a cache directory they are cached in a
+# temporary one for the second read.  Returns the sections, the number of
+# jobs and the number of duplicate records dropped.
+def stream_report_stats(file_names,windows,budget_mb,workers=1,cache_dir=None,rebuild=False,\
+                        percentiles=False,sections=None,names=None):
+    if cache_dir is not None and not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir)
+    workdir = tempfile.mkdtemp(prefix="stream",dir=cache_dir)
+    try:
+        if cache_dir is None:
+            cache_dir = workdir
+        with profiler.phase("stream/duplicates") as entry:
+            dropped = duplicate_rows(file_names,budget_mb,workdir,workers,cache_dir,rebuild)
+            entry['records'] = len(dropped)
+        # An empty table gives every section the names it always has
+        result = dict()
+        empty = JobTable()
+        for section, column, multinode, details in selected_sections(sections):
+            result[section] = GroupedSummaryStats(empty,column,windows,None,details,percentiles)
+        # Order of first appearance of every name, dropped records included,
+        # which is the order of the names in a JobTable of all the files
+        order = dict()
+        total = 0
+        with profiler.phase("stream/aggregate") as entry:
+            for first, chunk in table_chunks(file_names,budget_mb,workers,cache_dir):
+                for column in chunk.category_columns:
+                    seen = order.setdefault(column,dict())
+                    for name in chunk.names[column]:
+                        seen.setdefault(name,len(seen))
+                drop = dropped[np.searchsorted(dropped,first):\
+                               np.searchsorted(dropped,first + len(chunk))] - first
+                kept = None
+                if len(drop) > 0:
+                    kept = np.setdiff1d(np.arange(len(chunk)),drop)
+                for section, column, multinode, details in selected_sections(sections):
+                    selected = section_rows(chunk,column,multinode,names,kept)
+                    if kept is not None and section_rows(chunk,column,multinode,names) is None:
+                        # Every name of the table is listed, whatever its rows
+                        merge_grouped(result[section],OrderedDict(\
+                            [(name,[SummaryStats(name,label,start_t,end_t,percentiles) \
+                                    for (label,start_t,end_t) in windows]) \
+                             for name in chunk.grouping(column)[1]]))
+                    merge_grouped(result[section],\
+                                  GroupedSummaryStats(chunk,column,windows,selected,details,\
+                                                      percentiles))
+                total += len(chunk)
+                del chunk
+            entry['records'] = total
+    finally:
+        shutil.rmtree(workdir)
+    for section, column, multinode, details in selected_sections(sections):
+        if column is not None and column in order:
+            result[section] = OrderedDict(sorted(result[section].items(),\
+                                                 key=lambda item: order[column][item[0]]))
+    return result, total - len(dropped), len(dropped)
@@ -0,0 +1,338 @@
+# Totals of the jobs of one window (SummaryStats), their percentile
+# sketches and the tables they are printed in
+import time
+import numpy as np
+
+secs_to_hours = np.float(1.0e+0)/np.float(3600e+0)
+zero = np.longdouble(0.0e+0)
+
+# Mergeable histogram of non-negative integers (seconds) for percentiles.
+# Values below 2*resolution get a bucket each; above that each power of two
+# is split into resolution buckets, so no bucket is wider than 1/resolution
+# of the values in it.  Only non-empty buckets are kept and there are fewer
+# than num_buckets of them for any int64, so memory is bounded however many
+# values are added, and two histograms merge by adding counts.
+class LogHistogram:
+    bits = 7
+    resolution = 1 << bits
+    num_buckets = 1 << 13
+    # Values added one at a time are bucketed in batches of this many
+    batch = 1024
+
+    def __init__(self,buckets=None,counts=None):
+        if buckets is None:
+            buckets = np.zeros(0,dtype=np.int64)
+            counts = np.zeros(0,dtype=np.int64)
+        self.buckets = buckets
+        self.counts  = counts
+        self.pending = list()
+
+    # Bucket of every value in an array
+    @classmethod
+    def bucket(cls,values):
+        values = np.maximum(np.asarray(values,dtype=np.int64),0)
+        big = values >= cls.resolution
+        shift = np.zeros(len(values),dtype=np.int64)
+        shift[big] = np.floor(np.log2(values[big])).astype(np.int64) - cls.bits
+        # log2 of a float can be off by one next to a power of two
+        shift += (values >> shift) >= 2 * cls.resolution
+        shift -= (shift > 0) & ((values >> shift) < cls.resolution)
+        return np.where(big,shift * cls.resolution + (values >> shift),values)
+
+    # Smallest and largest value that falls in each bucket
+    @classmethod
+    def bounds(cls,buckets):
+        shift = np.maximum(buckets // cls.resolution - 1,0)
+        low = np.where(buckets < cls.resolution,buckets,\
+                       (buckets % cls.resolution + cls.resolution) << shift)
+        return low, low + (1 << shift) - 1
+
+    def add(self,value):
+        self.pending.append(value)
+        if len(self.pending) >= self.batch:
+            self._flush()
+
+    def add_buckets(self,buckets,counts):
+        if len(self.buckets) == 0:
+            self.buckets = buckets
+            self.counts = counts
+        elif len(buckets) > 0:
+            self.buckets, inverse = np.unique(np.concatenate((self.buckets,buckets)),\
+                                              return_inverse=True)
+            total = np.zeros(len(self.buckets),dtype=np.int64)
+            np.add.at(total,inverse,np.concatenate((self.counts,counts)))
+            self.counts = total
+
+    def _flush(self):
+        if len(self.pending) > 0:
+            buckets, counts = np.unique(self.bucket(self.pending),return_counts=True)
+            self.pending = list()
+            self.add_buckets(buckets,counts.astype(np.int64))
+
+    def merge(self,other):
+        other._flush()
+        self.add_buckets(other.buckets,other.counts)
+        return self
+
+    # The value below which a fraction q of the values fall, as the middle
+    # of its bucket (exact for values below 2*resolution); None when empty
+    def quantile(self,q):
+        self._flush()
+        if len(self.counts) == 0:
+            return None
+        cumulative = np.cumsum(self.counts)
+        rank = max(int(np.ceil(q * cumulative[-1])),1)
+        b = self.buckets[np.searchsorted(cumulative,rank):][:1]
+        low, high = self.bounds(b)
+        return (int(low[0]) + int(high[0])) / 2.0
+
+
+class SummaryStats(object):
+    metrics = ('wait','run','turnaround','cores','nodes')
+    details = ('users','groups','queues')
+    percentile_metrics = ('wait','run','turnaround')
+    percentile_points = (50,90,99)
+
+    def __init__(self,owner,label,start_time,end_time,percentiles=False):
+        self.owner    = owner
+        self.label    = label
+        self.start_t  = start_time
+        self.end_t    = end_time
+        self.num_jobs = 0
+        self.num_days = (self.end_t - self.start_t) / float(60*60*24)
+        # Exact integer sum, min and max of each metric.  The [min,max,avg]
+        # lists (self.wait, self.run, ...) are derived from these when read.
+        for metric in self.metrics:
+            setattr(self,metric + '_sum',0)
+            setattr(self,metric + '_min',0)
+            setattr(self,metric + '_max',0)
+        # [name, number of jobs, CPU seconds] per user/group/queue, in order
+        # of first appearance, indexed by name
+        self.users = list()
+        self.groups = list()
+        self.queues = list()
+        self._index = dict()
+        for kind in self.details:
+            self._index[kind] = dict()
+        # LogHistogram per metric in percentile_metrics when percentiles are
+        # tracked, None when they are not
+        self.sketches = None
+        if percentiles:
+            self.sketches = dict()
+            for metric in self.percentile_metrics:
+                self.sketches[metric] = LogHistogram()
+
+    def _summary(self,metric):
+        if self.num_jobs == 0:
+            return [zero, zero, zero]
+        return [np.longdouble(getattr(self,metric + '_min')),\
+                np.longdouble(getattr(self,metric + '_max')),\
+                np.longdouble(getattr(self,metric + '_sum')) / self.num_jobs]
+
+    # The following are lists of min,max,avg
+    wait       = property(lambda self: self._summary('wait'))
+    run        = property(lambda self: self._summary('run'))
+    turnaround = property(lambda self: self._summary('turnaround'))
+    cores      = property(lambda self: self._summary('cores'))
+    nodes      = property(lambda self: self._summary('nodes'))
+
+    # The p-th percentile of a metric, kept within the exact min and max
+    def percentile(self,metric,p):
+        if self.sketches is None or self.num_jobs == 0:
+            return zero
+        value = self.sketches[metric].quantile(p / 100.0)
+        if value is None:
+            return zero
+        value = min(max(value,getattr(self,metric + '_min')),getattr(self,metric + '_max'))
+        return np.longdouble(value)
+
+    # [p50, p90, p99] of a metric
+    def percentiles(self,metric):
+        return [self.percentile(metric,p) for p in self.percentile_points]
+
+    # Add jobs and CPU time to one user/group/queue entry
+    def add_usage(self,kind,name,jobs,cpu):
+        entry = self._index[kind].get(name)
+        if entry is None:
+            entry = [name,0,0]
+            self._index[kind][name] = entry
+            getattr(self,kind).append(entry)
+        entry[1] += jobs
+        entry[2] += cpu
+
+    def _add_values(self,jobs,values):
+        # values holds (sum,min,max) per metric
+        for metric, (total, low, high) in zip(self.metrics,values):
+            setattr(self,metric + '_sum',getattr(self,metric + '_sum') + total)
+            if self.num_jobs == 0:
+                setattr(self,metric + '_min',low)
+                setattr(self,metric + '_max',high)
+            else:
+                setattr(self,metric + '_min',min(getattr(self,metric + '_min'),low))
+                setattr(self,metric + '_max',max(getattr(self,metric + '_max'),high))
+        self.num_jobs += jobs
+
+    def update(self,job):
+        timestamp = job.ctime
+        if (timestamp >= self.start_t) and (timestamp <= self.end_t):
+            # Each attribute of a Job view is a column lookup, so read them once
+            wait_val  = job.waittime
+            run_val   = job.runtime
+            turn_val  = wait_val + run_val
+            cores_val = job.num_cores
+            nodes_val = job.unique_nodes
+            cpu_secs  = job.cpu_secs
+            self._add_values(1,((wait_val,wait_val,wait_val),\
+                                (run_val,run_val,run_val),\
+                                (turn_val,turn_val,turn_val),\
+                                (cores_val,cores_val,cores_val),\
+                                (nodes_val,nodes_val,nodes_val)))
+            self.add_usage('users',job.user,1,cpu_secs)
+            self.add_usage('groups',job.group,1,cpu_secs)
+            self.add_usage('queues',job.queue,1,cpu_secs)
+            if self.sketches is not None:
+                self.sketches['wait'].add(wait_val)
+                self.sketches['run'].add(run_val)
+                self.sketches['turnaround'].add(turn_val)
+
+    # update() with every job among rows of a JobTable (every row when None)
+    # at once.  Sums, mins and maxes are NumPy reductions over the int64
+    # columns, so the totals are exactly those of the per-job path, and the
+    # user/group/queue entries are added in the same order of first
+    # appearance.
+    def update_many(self,table,rows=None):
+        columns = table.columns
+        if rows is None:
+            rows = np.arange(table.size)
+        ctime = columns['ctime'][rows]
+        rows = rows[(ctime >= self.start_t) & (ctime <= self.end_t)]
+        if len(rows) == 0:
+            return
+        start = columns['start'][rows]
+        wait = np.maximum(start - columns['etime'][rows],0)
+        run = np.maximum(columns['end'][rows] - start,0)
+        values = {'wait':wait,'run':run,'turnaround':wait + run,\
+                  'cores':columns['num_cores'][rows],'nodes':columns['unique_nodes'][rows]}
+        self._add_values(len(rows),[(int(values[metric].sum()),\
+                                     int(values[metric].min()),\
+                                     int(values[metric].max())) \
+                                    for metric in self.metrics])
+        cpu = columns['cpu_secs'][rows]
+        for column, kind in (('user','users'),('group','groups'),('queue','queues')):
+            codes, first, inverse, counts = np.unique(columns[column][rows],return_index=True,\
+                                                      return_inverse=True,return_counts=True)
+            cpu_sums = np.zeros(len(codes),dtype=np.int64)
+            np.add.at(cpu_sums,inverse,cpu)
+            names = table.names[column]
+            for k in np.argsort(first):
+                self.add_usage(kind,names[codes[k]],int(counts[k]),int(cpu_sums[k]))
+        if self.sketches is not None:
+            for metric in self.percentile_metrics:
+                buckets, counts = np.unique(LogHistogram.bucket(values[metric]),\
+                                            return_counts=True)
+                self.sketches[metric].add_buckets(buckets,counts.astype(np.int64))
+
+    # Fold in the totals of another SummaryStats for the same window, e.g.
+    # one built from a different chunk of jobs.  The result is exactly what
+    # a single SummaryStats fed both sets of jobs would hold.
+    def merge(self,other):
+        if other.num_jobs > 0:
+            self._add_values(other.num_jobs,\
+                             [(getattr(other,metric + '_sum'),\
+                               getattr(other,metric + '_min'),\
+                               getattr(other,metric + '_max')) \
+                              for metric in self.metrics])
+        for kind in self.details:
+            for name, jobs, cpu in getattr(other,kind):
+                self.add_usage(kind,name,jobs,cpu)
+        if other.sketches is not None:
+            if self.sketches is None:
+                self.sketches = dict()
+                for metric in self.percentile_metrics:
+                    self.sketches[metric] = LogHistogram()
+            for metric in self.percentile_metrics:
+                self.sketches[metric].merge(other.sketches[metric])
+        return self
+
+    def print_info(self):
+        print ("Summary statistics for %s") % self.label
+        print ("  From                  : %s\n  To                    : %s (%d days total)") % \
+              (time.ctime(self.start_t),time.ctime(self.end_t),self.num_days)
+        print ("  Owner                 : %7s") % self.owner
+        print ("  Number of jobs        : %7d") % self.num_jobs
+        jobs_per_day = 0.0
+        # Windows can be shorter than a day, or empty
+        if self.num_days > 0:
+            jobs_per_day = self.num_jobs / self.num_days
+        print ("  Jobs/day              : %7.1f") % jobs_per_day
+        print ("  Wait times (hours)    : %7.2f, %7.2f, %7.2f (min,max,avg)") % \
+              (self.wait[0] * secs_to_hours,\
+               self.wait[1] * secs_to_hours,\
+               self.wait[2] * secs_to_hours)
+        if self.sketches is not None:
+            print ("  Wait times (hours)    : %7.2f, %7.2f, %7.2f (p50,p90,p99)") % \
+                  tuple([value * secs_to_hours for value in self.percentiles('wait')])
+        print ("  Run times (hours)     : %7.2f, %7.2f, %7.2f (min,max,avg)") % \
+              (self.run[0] * secs_to_hours,\
+               self.run[1] * secs_to_hours,\
+               self.run[2] * secs_to_hours)
+        if self.sketches is not None:
+            print ("  Run times (hours)     : %7.2f, %7.2f, %7.2f (p50,p90,p99)") % \
+                  tuple([value * secs_to_hours for value in self.percentiles('run')])
+        print ("  Job turnaournd (hours): %7.2f, %7.2f, %7.2f (min,max,avg)") % \
+              (self.turnaround[0] * secs_to_hours,\
+               self.turnaround[1] * secs_to_hours,\
+               self.turnaround[2] * secs_to_hours)
+        if self.sketches is not None:
+            print ("  Job turnaournd (hours): %7.2f, %7.2f, %7.2f (p50,p90,p99)") % \
+                  tuple([value * secs_to_hours for value in self.percentiles('turnaround')])
+        print ("  Cores per job         : %7.2f, %7.2f, %7.2f (min,max,avg)") % \
+              (self.cores[0],self.cores[1],self.cores[2])
+        if self.nodes[1] > 1:
+            print ("  Nodes per job         : %7.2f, %7.2f, %7.2f (min,max,avg)") % \
+                  (self.nodes[0],self.nodes[1],self.nodes[2])
+
+
+def CombinedSummaryTable (data_list,col_header="",\
+                          user_detail=False,group_detail=False,queue_detail=False):
+    # Print the header
+    counter = 0
+    for data in data_list:
+        counter += 1
+        if counter == 1:
+            print ("%-15s          Average Times (h)            Cores per") % (col_header)
+            print ("%-15s    Wait      Run      Turnaround         Job         Jobs") % (data.owner)
+            print ("-------------------------------------------------------------------------")
+        print ("%-15s%8.2f%9.2f%13.2f%15.1f%13d") % (data.label,\
+                                               data.wait[2] * secs_to_hours,\
+                                               data.run[2] * secs_to_hours,\
+                                               data.turnaround[2] * secs_to_hours,\
+                                               data.cores[2],data.num_jobs)
+        if data.sketches is not None:
+            for p, wait, run, turnaround in zip(data.percentile_points,\
+                                                data.percentiles('wait'),\
+                                                data.percentiles('run'),\
+                                                data.percentiles('turnaround')):
+                print ("  p%-13d%8.2f%9.2f%13.2f") % (p,wait * secs_to_hours,\
+                                                     run * secs_to_hours,\
+                                                     turnaround * secs_to_hours)
+        if user_detail and len(data.users) > 0:
+            # Sort the list by CPU time, ties by name
+            data.users.sort(key=lambda array: (-array[2],array[0]))
+            print ("  Users           Total CPU time")
+            for user in data.users:
+                print ("     %-15s%12.2f%41d") % (user[0],user[2] * secs_to_hours,user[1])
+        if group_detail and len(data.groups) > 0:
+            # Sort the list by name
+            data.groups.sort(key=lambda array: array[0])
+            print ("  Group           Total CPU time")
+            for group in data.groups:
+                print ("     %-15s%12.2f%41d") % (group[0],group[2] * secs_to_hours,group[1])
+        if queue_detail and len(data.queues) > 0:
+            # Sort the list by number of jobs, ties by name
+            data.queues.sort(key=lambda array: (-array[1],array[0]))
+            print ("  Queue           Total CPU time")
+            for queue in data.queues:
+                print ("     %-15s%12.2f%41d") % (queue[0],queue[2] * secs_to_hours,queue[1])
+    print ("\n")
+        
@@ -0,0 +1,422 @@
+# JobTable, the columnar store of the jobs in a report, and Job, the view
+# of one of its rows
+import array
+import os
+import shutil
+import time
+import numpy as np
+from jobstats.logfiles import read_line
+from jobstats.records import JobRecord, decode_exec_host, parse_job_id
+
+# Bump whenever JobRecord or the JobTable columns change, so that cached
+# tables written by an older parser are re-parsed instead of reused.
+PARSER_VERSION = 7
+
+# Columnar store for the jobs that make it into the reports.  Numeric fields
+# live in one NumPy array per column and user/group/queue are interned into
+# integer codes, so a job costs a few dozen bytes instead of a full object.
+# The hosts of every job are kept CSR-style: the num_hosts column counts
+# them and host_list/host_cores hold the host codes and the cores used on
+# each, row after row.  Everything else about a job is re-read from its
+# accounting file on demand.
+class JobTable:
+    int_columns      = ('ctime','qtime','etime','start','end',\
+                        'num_cores','unique_nodes','cpu_secs','walltime_secs','gpus',\
+                        'job_id','array_index',\
+                        'mem_bytes','vmem_bytes','req_pmem_bytes','req_walltime_secs')
+    category_columns = ('user','group','queue','server')
+    # How save() stacks the columns, by type
+    stored_columns   = (('ints',int_columns + ('offset',)),\
+                        ('codes',category_columns + ('source','num_hosts')),\
+                        ('flags',('multinode',)))
+
+    def __init__(self):
+        self.size    = 0
+        self.files   = list()
+        self.columns = dict()
+        self.names   = dict()
+        self.codes   = dict()
+        self._file_codes = dict()
+        self._pending    = dict()
+        for column in self.int_columns:
+            self._pending[column] = array.array('l')
+        for column in self.category_columns:
+            self._pending[column] = array.array('i')
+            self.names[column]    = list()
+            self.codes[column]    = dict()
+        self._pending['multinode'] = array.array('b')
+        self._pending['source']    = array.array('i')
+        self._pending['offset']    = array.array('l')
+        self._pending['num_hosts'] = array.array('i')
+        self.names['host'] = list()
+        self.codes['host'] = dict()
+        self.host_list  = np.zeros(0,dtype=np.int32)
+        self.host_cores = np.zeros(0,dtype=np.int32)
+        self._pending_hosts = (array.array('i'),array.array('i'))
+        self.freeze()
+
+    def intern(self,column,name):
+        codes = self.codes[column]
+        code = codes.get(name)
+        if code is None:
+            code = len(codes)
+            codes[name] = code
+            self.names[column].append(name)
+        return code
+
+    def append(self,record,filename,offset):
+        self.append_row([getattr(record,column) for column in self.int_columns],\
+                        [getattr(record,column) for column in self.category_columns],\
+                        decode_exec_host(record.hosts),filename,offset)
+
+    # Append one job given its int_columns and category_columns values and
+    # its decoded exec_host
+    def append_row(self,ints,categories,exec_host,filename,offset):
+        pending = self._pending
+        for column, value in zip(self.int_columns,ints):
+            pending[column].append(value)
+        for column, name in zip(self.category_columns,categories):
+            pending[column].append(self.intern(column,name))
+        pending['multinode'].append(exec_host.multinode)
+        pending['source'].append(self.file_code(filename))
+        pending['offset'].append(offset)
+        pending['num_hosts'].append(exec_host.num_nodes)
+        host_list, host_cores = self._pending_hosts
+        for hostname in exec_host.hosts:
+            host_list.append(self.intern('host',hostname))
+        host_cores.extend(exec_host.cores)
+
+    def file_code(self,filename):
+        source = self._file_codes.get(filename)
+        if source is None:
+            source = len(self.files)
+            self._file_codes[filename] = source
+            self.files.append(filename)
+        return source
+
+    # Append all rows of another JobTable, re-coding its names and files
+    def extend(self,other):
+        self.extend_many([other])
+
+    # extend() by several tables at once, concatenating every column once
+    # rather than once per table
+    def extend_many(self,others):
+        self.freeze()
+        parts = dict([(column,[values]) for column, values in self.columns.items()])
+        host_lists = [self.host_list]
+        host_cores = [self.host_cores]
+        for other in others:
+            other.freeze()
+            new = dict(other.columns)
+            for column in self.category_columns:
+                remap = [self.intern(column,name) for name in other.names[column]]
+                new[column] = np.array(remap,dtype=np.int32)[other.columns[column]]
+            remap = [self.file_code(filename) for filename in other.files]
+            new['source'] = np.array(remap,dtype=np.int32)[other.columns['source']]
+            for column, values in new.items():
+                parts[column].append(values)
+            remap = [self.intern('host',hostname) for hostname in other.names['host']]
+            host_lists.append(np.array(remap,dtype=np.int32)[other.host_list])
+            host_cores.append(other.host_cores)
+        for column, values in parts.items():
+            self.columns[column] = np.concatenate(values)
+        self.host_list = np.concatenate(host_lists)
+        self.host_cores = np.concatenate(host_cores)
+        self.size = len(self.columns['ctime'])
+
+    # Move appended rows into the NumPy columns.  Must be called before the
+    # rows are read back.
+    def freeze(self):
+        for column, values in self._pending.items():
+            new = np.frombuffer(values,dtype=values.typecode).copy()
+            if column in self.columns:
+                self.columns[column] = np.concatenate((self.columns[column],new))
+            else:
+                self.columns[column] = new
+            self._pending[column] = array.array(values.typecode)
+        host_list, host_cores = self._pending_hosts
+        if len(host_list) > 0:
+            self.host_list = np.concatenate((self.host_list,\
+                                             np.frombuffer(host_list,dtype=np.int32)))
+            self.host_cores = np.concatenate((self.host_cores,\
+                                              np.frombuffer(host_cores,dtype=np.int32)))
+            self._pending_hosts = (array.array('i'),array.array('i'))
+        self.columns['multinode'] = self.columns['multinode'].astype(bool)
+        self.size = len(self.columns['ctime'])
+
+    # A new table of the given rows, in that order, with the same names and
+    # files
+    def take(self,rows):
+        self.freeze()
+        table = JobTable()
+        for column in self.names:
+            table.names[column] = list(self.names[column])
+            table.codes[column] = dict(self.codes[column])
+        table.files = list(self.files)
+        table._file_codes = dict(self._file_codes)
+        for column, values in self.columns.items():
+            table.columns[column] = values[rows]
+        lengths = self.columns['num_hosts'][rows]
+        offsets = np.cumsum(lengths) - lengths
+        hosts = np.repeat(self.host_offsets()[rows] - offsets,lengths) + np.arange(lengths.sum())
+        table.host_list = self.host_list[hosts]
+        table.host_cores = self.host_cores[hosts]
+        table.size = len(rows)
+        return table
+
+    # Start of every row's hosts in host_list, plus the end of the last row's
+    def host_offsets(self):
+        return np.concatenate(([0],np.cumsum(self.columns['num_hosts'],dtype=np.int64)))
+
+    # Write the table to a directory: the columns of each kind in
+    # stored_columns stacked as the rows of one .npy file, the hosts of
+    # every row likewise, and the name tables in a text file, so that
+    # loading a table opens a handful of files.  key identifies the source
+    # the table was built from and is checked by load().
+    def save(self,directory,key):
+        self.freeze()
+        tmp = "%s.tmp%d" % (directory,os.getpid())
+        if os.path.isdir(tmp):
+            shutil.rmtree(tmp)
+        os.makedirs(tmp)
+        for kind, columns in self.stored_columns:
+            np.save(os.path.join(tmp,kind + ".npy"),\
+                    np.vstack([self.columns[column] for column in columns]))
+        np.save(os.path.join(tmp,"hosts.npy"),np.vstack((self.host_list,self.host_cores)))
+        namefile = open(os.path.join(tmp,"names"),"w")
+        for column, names in [(column,self.names[column]) \
+                              for column in self.category_columns + ('host',)] + \
+                             [('files',self.files)]:
+            namefile.write("%s %d\n" % (column,len(names)))
+            namefile.write("".join([name + "\n" for name in names]))
+        namefile.close()
+        # The key is written last and marks the entry as complete
+        keyfile = open(os.path.join(tmp,"key"),"w")
+        keyfile.write(repr(key))
+        keyfile.close()
+        if os.path.isdir(directory):
+            shutil.rmtree(directory)
+        os.rename(tmp,directory)
+
+    # Memory-map a table written by save().  Returns None if there is no
+    # complete table in directory or it was saved under a different key.
+    @classmethod
+    def load(cls,directory,key):
+        try:
+            keyfile = open(os.path.join(directory,"key"),"r")
+            saved_key = keyfile.read()
+            keyfile.close()
+        except IOError:
+            return None
+        if saved_key != repr(key):
+            return None
+        table = cls()
+        for kind, columns in table.stored_columns:
+            stacked = np.load(os.path.join(directory,kind + ".npy"),mmap_mode='r')
+            for k, column in enumerate(columns):
+                table.columns[column] = stacked[k]
+        table.host_list, table.host_cores = np.load(os.path.join(directory,"hosts.npy"),\
+                                                    mmap_mode='r')
+        lines = open(os.path.join(directory,"names"),"r").read().split("\n")
+        k = 0
+        while k < len(lines) - 1:
+            column, count = lines[k].split(' ')
+            names = lines[k + 1:k + 1 + int(count)]
+            k += 1 + int(count)
+            if column == 'files':
+                for filename in names:
+                    table.file_code(filename)
+            else:
+                for name in names:
+                    table.intern(column,name)
+        table.size = len(table.columns['ctime'])
+        return table
+
+    # Integer codes and names to group rows by.  column None puts every job
+    # under the single name "all".
+    def grouping(self,column):
+        if column is None:
+            return np.zeros(self.size,dtype=np.int32), ["all"]
+        return self.columns[column], self.names[column]
+
+    # Indices of the rows whose column equals value (a name for categories)
+    def rows(self,column,value):
+        if column in self.codes:
+            value = self.codes[column].get(value,-1)
+        return np.flatnonzero(self.columns[column] == value)
+
+    # Indices of the rows among rows (every row when None) whose column is
+    # any of values
+    def rows_in(self,column,values,rows=None):
+        if column in self.codes:
+            values = [self.codes[column].get(value,-1) for value in values]
+        if rows is None:
+            return np.flatnonzero(np.in1d(self.columns[column],values))
+        return rows[np.in1d(self.columns[column][rows],values)]
+
+    def select(self,column,value):
+        for row in self.rows(column,value):
+            yield Job(self,row)
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self,row):
+        return Job(self,row)
+
+    def __iter__(self):
+        for row in xrange(self.size):
+            yield Job(self,row)
+
+
+# Lightweight view of one row of a JobTable
+class Job(object):
+    __slots__ = ('table','row','_detail')
+
+    def __init__(self,table,row):
+        self.table   = table
+        self.row     = row
+        self._detail = None
+
+    def __getattr__(self,name):
+        table = self.table
+        column = table.columns.get(name)
+        if column is not None:
+            value = column.item(self.row)
+            if name in table.names:
+                return table.names[name][value]
+            return value
+        if self._detail is None:
+            self._detail = self.read_record()
+        return getattr(self._detail,name)
+
+    @property
+    def runtime(self):
+        return max(self.end - self.start,0)
+
+    @property
+    def waittime(self):
+        return max(self.start - self.etime,0)
+
+    @property
+    def holdtime(self):
+        return max(self.etime - self.qtime,0)
+
+    # Re-read and decode this job's line from its accounting file
+    def read_record(self):
+        table = self.table
+        data = read_line(table.files[table.columns['source'][self.row]],\
+                         int(table.columns['offset'][self.row])).split(';')
+        data[3] = data[3].split()
+        return JobRecord(data)
+
+    def print_info(self):
+        print ("Job ID = %s") % self.ID
+        print ("======================================")
+        print ("Status        = %s") % self.jobstate
+        print ("Session ID    = %s") % self.session_ID
+        print ("Exit status   = %s") % self.exit_status
+        print ("Last log time = %s") % self.logtime
+        print ("User          = %s") % self.user
+        print ("  email       = %s") % self.email
+        print ("Group         = %s") % self.group
+        print ("Name          = %s") % self.jobname
+        print ("Queue         = %s") % self.queue
+        print ("Submit time   = %s (%d)") % (time.ctime(self.ctime),self.ctime)
+        print ("Time Queued   = %s (%d)") % (time.ctime(self.qtime),self.qtime)
+        print ("Time Eligible = %s (%d)") % (time.ctime(self.etime),self.etime)
+        print ("Start Time    = %s (%d)") % (time.ctime(self.start),self.start)
+        print ("End Time      = %s (%d)") % (time.ctime(self.end),self.end)
+        if hasattr(self,'unique_nodes'):
+            print ("Hosts used    = %s unique: %s (requested %s)") % \
+                  (self.unique_nodes,self.hosts,self.req_numnodes)
+        else:
+            print ("Hosts used    = Unknown")
+        print ("Cores         = %d") % self.num_cores
+        if hasattr(self,'gpu'):
+            print ("GPUs          = %d") % self.gpu
+        print ("Memory        = %s physcial, %s virtual") % \
+                                      (self.pmem,self.vmem)
+        if hasattr(self,'req_memory'):
+            print ("                (%s requested)") % self.req_memory
+        print ("Walltime      = %s ( %d s)") % (self.walltime,self.walltime_secs)
+        print ("CPU time      = %s ( %d s)") % (self.cpu,self.cpu_secs)
+        print ("Wait time     = %d") % self.waittime
+        print ("")
+        
+
+
+# Index of the jobs of a JobTable by (server, job number, array index).  The
+# three are packed into one int64 key per row and the keys sorted, so the
+# records of a job are found with a binary search and the repeated records
+# of a job sit next to each other.  Rows whose job number couldn't be read
+# are left out.
+class JobIndex:
+    server_bits = 11
+    id_bits     = 31
+    index_bits  = 21
+
+    def __init__(self,table):
+        self.table = table
+        columns = table.columns
+        keys = self.pack(columns['server'],columns['job_id'],columns['array_index'])
+        rows = np.flatnonzero(keys >= 0)
+        # Stable, so the records of one job stay in the order they were read
+        self.rows = rows[np.argsort(keys[rows],kind='mergesort')]
+        self.keys = keys[self.rows]
+
+    # Keys of (server code, job number, array index) arrays; -1 where they
+    # don't fit
+    @classmethod
+    def pack(cls,server,job_id,array_index):
+        server = np.asarray(server,dtype=np.int64)
+        job_id = np.asarray(job_id,dtype=np.int64)
+        array_index = np.asarray(array_index,dtype=np.int64)
+        valid = (job_id >= 0) & (job_id < 1 << cls.id_bits) & \
+                (server < 1 << cls.server_bits) & (array_index < (1 << cls.index_bits) - 1)
+        keys = (server << (cls.id_bits + cls.index_bits)) + (job_id << cls.index_bits) + \
+               (array_index + 1)
+        return np.where(valid,keys,-1)
+
+    def __len__(self):
+        return len(self.rows)
+
+    # Rows that repeat a job read in another row (the job is in two
+    # overlapping files, or was requeued and ended twice), sorted.  Of the
+    # records of a job the one with the latest end is kept, and of those
+    # ending at the same time the last one read.
+    def duplicates(self):
+        same = self.keys[1:] == self.keys[:-1]
+        if not same.any():
+            return np.zeros(0,dtype=np.int64)
+        repeated = np.flatnonzero(np.concatenate((same,[False])) | np.concatenate(([False],same)))
+        rows = self.rows[repeated]
+        keys = self.keys[repeated]
+        order = np.lexsort((rows,self.table.columns['end'][rows],keys))
+        rows = rows[order]
+        keys = keys[order]
+        kept = np.concatenate((keys[1:] != keys[:-1],[True]))
+        return np.sort(rows[~kept])
+
+    # Rows of the jobs a job ID such as "1664357", "1664357[90]" or
+    # "1664357[90].clusman0" names.  Without an array index every element
+    # of an array job matches; without a server (or with only the start of
+    # its name) every server does.
+    def lookup(self,text):
+        job_id, array_index, server = parse_job_id(text)
+        if job_id < 0:
+            return np.zeros(0,dtype=np.int64)
+        servers = [code for code, name in enumerate(self.table.names['server']) \
+                   if not server or name == server or name.startswith(server + '.')]
+        if '[' in text and array_index >= 0:
+            first = last = array_index
+        else:
+            first, last = -1, (1 << self.index_bits) - 2
+        found = list()
+        for code in servers:
+            lo = np.searchsorted(self.keys,self.pack(code,job_id,first),'left')
+            hi = np.searchsorted(self.keys,self.pack(code,job_id,last),'right')
+            found.append(self.rows[lo:hi])
+        if len(found) == 0:
+            return np.zeros(0,dtype=np.int64)
+        return np.concatenate(found)
@@ -0,0 +1,361 @@
+# Cluster utilization over time and per-node usage, and their reports
+import time
+import numpy as np
+from jobstats.aggregate import segment_reduce
+from jobstats.settings import seconds_per_day, utilization_bins
+from jobstats.summary import secs_to_hours
+
+# Cores, nodes and GPUs in use over time, from a sweep over the begin (+)
+# and end (-) events of the intervals of the jobs of a JobTable (or just
+# rows), by default from the start to the end of every job that ran.
+# Events are sorted once by (name in column, time), ends before begins at
+# the same time, so a single cumulative sum gives the step function of
+# every name: each name's intervals all end, so its level is back at zero
+# before the next name's events begin.  The integral of the step function
+# at each event gives the time-weighted average over any bin from two
+# binary searches.
+class Utilization:
+    resources = ('cores','nodes','gpus')
+
+    # The intervals of the jobs in rows, as the row, begin and end of every
+    # interval and a dict of resource -> value of each over it
+    def intervals(self,columns,rows):
+        return rows, columns['start'][rows], columns['end'][rows], \
+               {'cores':columns['num_cores'][rows],'nodes':columns['unique_nodes'][rows],\
+                'gpus':columns['gpus'][rows]}
+
+    def __init__(self,table,column=None,rows=None):
+        columns = table.columns
+        codes, self.names = table.grouping(column)
+        if rows is None:
+            rows = np.arange(table.size)
+        rows, begins, finishes, values = self.intervals(columns,rows)
+        keep = finishes > begins
+        rows = rows[keep]
+        n = len(rows)
+        times = np.concatenate((begins[keep],finishes[keep]))
+        ends = np.concatenate((np.zeros(n,dtype=bool),np.ones(n,dtype=bool)))
+        event_codes = np.concatenate((codes[rows],codes[rows])).astype(np.int64)
+        # One int64 sort key of (code, time, begin bit) is much faster to
+        # sort than the three keys separately
+        order = np.argsort((event_codes << 33) + (times << 1) + ~ends)
+        self.present = np.unique(event_codes)
+        self.codes = event_codes[order]
+        self.times = times[order]
+        self.keys  = (self.codes << 32) + self.times
+        # Level after each event, and its integral up to each event
+        self.levels = dict()
+        self.integrals = dict()
+        sign = np.where(ends[order],-1,1)
+        gaps = np.diff(self.times)
+        for resource in self.resources:
+            value = values[resource][keep]
+            level = np.cumsum(np.concatenate((value,value))[order] * sign)
+            self.levels[resource] = level
+            self.integrals[resource] = np.concatenate(([0],np.cumsum(level[:-1] * gaps)))
+
+    # The step function of one resource for one name, as the times of its
+    # events and the level from each time on
+    def steps(self,resource,name):
+        if name not in self.names:
+            return np.zeros(0,dtype=np.int64), np.zeros(0,dtype=np.int64)
+        code = self.names.index(name)
+        lo, hi = np.searchsorted(self.codes,[code,code + 1])
+        return self.times[lo:hi], self.levels[resource][lo:hi]
+
+    # Average and peak level of every resource in the bins starting at
+    # edges[i] and ending at edges[i+1], for every name with events.
+    # Returns the names and two dicts of resource -> array of shape
+    # (names, bins).
+    def bins(self,edges):
+        edges = np.clip(np.asarray(edges,dtype=np.int64),0,(1 << 32) - 1)
+        num_bins = len(edges) - 1
+        names = [self.names[code] for code in self.present]
+        averages = dict()
+        peaks = dict()
+        if len(self.present) == 0 or num_bins < 1:
+            for resource in self.resources:
+                averages[resource] = np.zeros((len(names),max(num_bins,0)))
+                peaks[resource] = np.zeros((len(names),max(num_bins,0)),dtype=np.int64)
+            return names, averages, peaks
+        keys = (self.present << 32)[:,np.newaxis] + edges
+        # Last event at or before each edge.  When it belongs to an earlier
+        # name the level is zero and the integral has not moved since.
+        before = np.searchsorted(self.keys,keys,'right') - 1
+        same = (before >= 0) & (self.codes[np.maximum(before,0)] == self.present[:,np.newaxis])
+        last = np.maximum(before,0)
+        widths = np.diff(edges).astype(float)
+        # Events strictly inside each bin, from the first event when none
+        # comes before the bin
+        lo = (before[:,:-1] + 1).ravel()
+        hi = np.maximum(np.searchsorted(self.keys,keys[:,1:],'left').ravel(),lo)
+        for resource in self.resources:
+            level = np.where(same,self.levels[resource][last],0)
+            area = self.integrals[resource][last] + \
+                   np.where(same,level * (edges - self.times[last]),0)
+            averages[resource] = np.diff(area,axis=1) / widths
+            inside = segment_reduce(np.maximum,self.levels[resource],lo,hi,0)
+            peaks[resource] = np.maximum(level[:,:-1],inside.reshape(len(names),num_bins))
+        return names, averages, peaks
+
+    # Peak level of a resource between start_t and end_t for every name with
+    # events, and the time it was first reached, as two arrays in the order
+    # of the names of bins()
+    def peaks(self,resource,start_t,end_t):
+        start_t, end_t = [min(max(int(t),0),(1 << 32) - 1) for t in (start_t,end_t)]
+        levels = self.levels[resource]
+        peaks = np.zeros(len(self.present),dtype=np.int64)
+        times = np.zeros(len(self.present),dtype=np.int64)
+        first = np.searchsorted(self.keys,(self.present << 32) + start_t,'right')
+        last = np.searchsorted(self.keys,(self.present << 32) + end_t,'right')
+        for k, code in enumerate(self.present):
+            peaks[k], times[k] = 0, start_t
+            # Level carried in from before the window
+            if first[k] > 0 and self.codes[first[k] - 1] == code:
+                peaks[k] = levels[first[k] - 1]
+            if last[k] > first[k]:
+                top = first[k] + np.argmax(levels[first[k]:last[k]])
+                if levels[top] > peaks[k]:
+                    peaks[k], times[k] = levels[top], self.times[top]
+        return peaks, times
+
+
+# Jobs and cores waiting in the queue over time: a job waits from when it
+# becomes eligible to run (etime) until it starts, and is held before that
+# from when it was queued (qtime).  Records without a qtime or etime only
+# count from the next one.
+class Backlog(Utilization):
+    resources = ('jobs','cores','held')
+
+    def intervals(self,columns,rows):
+        start = columns['start'][rows]
+        etime = np.where(columns['etime'][rows] > 0,columns['etime'][rows],start)
+        qtime = np.where(columns['qtime'][rows] > 0,columns['qtime'][rows],etime)
+        zeros = np.zeros(len(rows),dtype=np.int64)
+        ones  = np.ones(len(rows),dtype=np.int64)
+        # The held intervals, then the waiting ones
+        return np.concatenate((rows,rows)), np.concatenate((qtime,etime)), \
+               np.concatenate((etime,start)), \
+               {'jobs':np.concatenate((zeros,ones)),\
+                'cores':np.concatenate((zeros,columns['num_cores'][rows])),\
+                'held':np.concatenate((ones,zeros))}
+
+
+# Inverted index from node to the jobs that ran on it.  Every (job, host)
+# pair of the table is sorted by (host, start), so the jobs of host h are
+# entries indptr[h]:indptr[h+1] in start order (CSR-style), with the table
+# row, start, end and cores used on the host of each.
+class NodeIndex:
+    def __init__(self,table):
+        columns = table.columns
+        self.table = table
+        self.names = table.names['host']
+        rows = np.repeat(np.arange(table.size),columns['num_hosts'])
+        hosts = np.asarray(table.host_list,dtype=np.int64)
+        start = columns['start'][rows]
+        order = np.argsort((hosts << 32) + start)
+        self.hosts = hosts[order]
+        self.rows  = rows[order]
+        self.start = start[order]
+        self.end   = np.maximum(columns['end'][self.rows],self.start)
+        self.cores = np.asarray(table.host_cores,dtype=np.int64)[order]
+        self.indptr = np.concatenate(([0],np.cumsum(np.bincount(self.hosts,\
+                                      minlength=len(self.names)))))
+
+    # Core-seconds and number of jobs on every node between start_t and
+    # end_t (inclusive), as two arrays indexed by host code
+    def usage(self,start_t,end_t):
+        overlap = np.minimum(self.end,end_t + 1) - np.maximum(self.start,start_t)
+        running = (self.start <= end_t) & (self.end >= start_t)
+        num_hosts = len(self.names)
+        core_secs = np.bincount(self.hosts,np.maximum(overlap,0) * self.cores,num_hosts)
+        jobs = np.bincount(self.hosts,running,num_hosts)
+        return core_secs.astype(np.int64), jobs.astype(np.int64)
+
+    # The count nodes with the most core-seconds between start_t and end_t,
+    # as (name, core-seconds, jobs), ties by name
+    def busiest(self,start_t,end_t,count):
+        core_secs, jobs = self.usage(start_t,end_t)
+        used = [h for h in np.flatnonzero(jobs > 0)]
+        used.sort(key=lambda h: (-core_secs[h],self.names[h]))
+        return [(self.names[h],int(core_secs[h]),int(jobs[h])) for h in used[:count]]
+
+    # Names of the nodes that appear in the accounting data but ran no job
+    # between start_t and end_t
+    def idle(self,start_t,end_t):
+        core_secs, jobs = self.usage(start_t,end_t)
+        return sorted([self.names[h] for h in np.flatnonzero(jobs == 0)])
+
+    # Table rows of the jobs that ran on a node between start_t and end_t,
+    # in start order, with the cores each used on it
+    def jobs_on(self,name,start_t,end_t):
+        code = self.table.codes['host'].get(name)
+        if code is None:
+            return np.zeros(0,dtype=np.int64), np.zeros(0,dtype=np.int64)
+        lo = self.indptr[code]
+        hi = lo + np.searchsorted(self.start[lo:self.indptr[code + 1]],end_t,'right')
+        ran = lo + np.flatnonzero(self.end[lo:hi] >= start_t)
+        return self.rows[ran], self.cores[ran]
+
+
+# Edges of the bins covering [start_t, end_t], starting on a whole hour or
+# at local midnight
+def bin_edges(start_t,end_t,bin_seconds):
+    if bin_seconds % seconds_per_day == 0:
+        t = time.localtime(start_t)
+        first = int(time.mktime((t.tm_year,t.tm_mon,t.tm_mday,0,0,0,0,0,-1)))
+    else:
+        first = start_t - start_t % bin_seconds
+    num_bins = (end_t - first) // bin_seconds + 1
+    return first + bin_seconds * np.arange(num_bins + 1,dtype=np.int64)
+
+
+# Average and peak cores, nodes and GPUs in use per hour or day, over the
+# part of the report windows that has jobs, for all jobs and, with column
+# set, for every name in it
+def print_utilization(JobList,windows,bin_name,column=None):
+    bin_seconds, bin_label = utilization_bins[bin_name]
+    print ("********************************************************************************")
+    print ("***************************** Cluster utilization ******************************")
+    print ("********************************************************************************")
+    columns = JobList.columns
+    ran = np.flatnonzero(columns['end'] > columns['start'])
+    if len(ran) == 0 or len(windows) == 0:
+        return
+    start_t = max(min([w[1] for w in windows]),int(columns['start'][ran].min()))
+    end_t = min(max([w[2] for w in windows]),int(columns['end'][ran].max()))
+    if end_t < start_t:
+        return
+    edges = bin_edges(start_t,end_t,bin_seconds)
+    groupings = [(None,"all jobs")]
+    if column is not None:
+        groupings.append((column,column + " %s"))
+    for grouping, title in groupings:
+        names, averages, peaks = Utilization(JobList,grouping).bins(edges)
+        for k, name in enumerate(names):
+            shown = range(len(edges) - 1)
+            if grouping is not None:
+                title_name = title % name
+                shown = np.flatnonzero(peaks['cores'][k] > 0)
+                if len(shown) == 0:
+                    continue
+            else:
+                title_name = title
+            print ("%s average (peak) use for %s") % (bin_label,title_name)
+            print ("Bin start                 Cores                Nodes                 GPUs")
+            print ("--------------------------------------------------------------------------------")
+            for b in shown:
+                print ("%-16s%12.1f (%6d)%12.1f (%6d)%12.1f (%6d)") % \
+                      (time.strftime('%Y-%m-%d %H:%M',time.localtime(edges[b])),\
+                       averages['cores'][k,b],peaks['cores'][k,b],\
+                       averages['nodes'][k,b],peaks['nodes'][k,b],\
+                       averages['gpus'][k,b],peaks['gpus'][k,b])
+            print ("\n")
+
+
+# Average and peak jobs waiting in the queue (and the cores they asked for)
+# and jobs held, for all jobs and for every name in column: a summary of
+# every report window, then the timeline per hour or day over the part of
+# the windows with a backlog
+def print_backlog(JobList,windows,bin_name,column='queue'):
+    bin_seconds, bin_label = utilization_bins[bin_name]
+    print ("********************************************************************************")
+    print ("******************************** Queue backlog *********************************")
+    print ("********************************************************************************")
+    groupings = [(None,"all jobs",Backlog(JobList))]
+    if len(groupings[0][2].times) == 0 or len(windows) == 0:
+        return
+    groupings.append((column,column + " %s",Backlog(JobList,column)))
+
+    for label, start_t, end_t in windows:
+        print ("Backlog, %s") % label
+        print ("%-15s%9s%9s  %-16s%10s%8s%8s") % \
+              (column.capitalize(),"Avg jobs","Peak","Peak at","Avg cores","Peak","Held")
+        print ("--------------------------------------------------------------------------------")
+        for grouping, title, backlog in groupings:
+            names, averages, peaks = backlog.bins([start_t,end_t + 1])
+            peak_jobs, peak_times = backlog.peaks('jobs',start_t,end_t)
+            for k, name in enumerate(names):
+                if grouping is None:
+                    name = "All"
+                elif peaks['jobs'][k,0] == 0 and peaks['held'][k,0] == 0:
+                    continue
+                peak_at = ""
+                if peak_jobs[k] > 0:
+                    peak_at = time.strftime('%Y-%m-%d %H:%M',time.localtime(peak_times[k]))
+                print ("%-15s%9.1f%9d  %-16s%10.1f%8d%8d") % \
+                      (name,averages['jobs'][k,0],peak_jobs[k],peak_at,\
+                       averages['cores'][k,0],peaks['cores'][k,0],peaks['held'][k,0])
+        print ("")
+    print ("\n")
+
+    times = groupings[0][2].times
+    start_t = max(min([w[1] for w in windows]),int(times[0]))
+    end_t = min(max([w[2] for w in windows]),int(times[-1]))
+    if end_t < start_t:
+        return
+    edges = bin_edges(start_t,end_t,bin_seconds)
+    for grouping, title, backlog in groupings:
+        names, averages, peaks = backlog.bins(edges)
+        for k, name in enumerate(names):
+            shown = range(len(edges) - 1)
+            if grouping is not None:
+                title_name = title % name
+                shown = np.flatnonzero((peaks['jobs'][k] > 0) | (peaks['held'][k] > 0))
+                if len(shown) == 0:
+                    continue
+            else:
+                title_name = title
+            print ("%s average (peak) backlog for %s") % (bin_label,title_name)
+            print ("Bin start          Waiting jobs        Waiting cores            Held jobs")
+            print ("--------------------------------------------------------------------------------")
+            for b in shown:
+                print ("%-16s%12.1f (%6d)%12.1f (%6d)%12.1f (%6d)") % \
+                      (time.strftime('%Y-%m-%d %H:%M',time.localtime(edges[b])),\
+                       averages['jobs'][k,b],peaks['jobs'][k,b],\
+                       averages['cores'][k,b],peaks['cores'][k,b],\
+                       averages['held'][k,b],peaks['held'][k,b])
+            print ("\n")
+
+
+# Busiest and idle nodes in every report window
+def print_node_usage(nodes,windows,busiest=None,idle=False):
+    print ("********************************************************************************")
+    print ("********************************** Node usage **********************************")
+    print ("********************************************************************************")
+    for label, start_t, end_t in windows:
+        if busiest is not None:
+            print ("Busiest nodes, %s") % label
+            print ("Node                 Core hours       Jobs")
+            print ("------------------------------------------")
+            for name, core_secs, jobs in nodes.busiest(start_t,end_t,busiest):
+                print ("%-15s%16.2f%11d") % (name,core_secs * secs_to_hours,jobs)
+            print ("")
+        if idle:
+            idle_nodes = nodes.idle(start_t,end_t)
+            print ("Idle nodes, %s (%d)") % (label,len(idle_nodes))
+            for first in range(0,len(idle_nodes),8):
+                print ("  " + " ".join(["%-8s" % name for name in \
+                                        idle_nodes[first:first + 8]])).rstrip()
+            print ("")
+    print ("\n")
+
+
+# Every job that ran on a node between start_t and end_t.  The job IDs are
+# re-read from the accounting files.
+def print_node_jobs(JobList,nodes,name,start_t,end_t):
+    rows, cores = nodes.jobs_on(name,start_t,end_t)
+    if (start_t,end_t) == (0,(1 << 32) - 1):
+        print ("Jobs on %s (%d)") % (name,len(rows))
+    else:
+        print ("Jobs on %s from %s to %s (%d)") % \
+              (name,time.ctime(start_t),time.ctime(end_t),len(rows))
+    print ("Job ID          User       Queue      Start             End                Cores")
+    print ("--------------------------------------------------------------------------------")
+    for row, num_cores in zip(rows,cores):
+        job = JobList[row]
+        print ("%-15s %-10s %-10s %-17s %-17s %6d") % \
+              (job.ID,job.user,job.queue,\
+               time.strftime('%Y-%m-%d %H:%M',time.localtime(job.start)),\
+               time.strftime('%Y-%m-%d %H:%M',time.localtime(job.end)),num_cores)
+    print ("\n")
@@ -0,0 +1,63 @@
+# Shared helpers of the tests: JobTables built from a few synthetic E
+# records, read by the same code as the real accounting files.
+import os
+import sys
+import time
+
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.abspath(__file__)),os.pardir))
+
+import pytest
+from jobstats.ingest import read_accounting_file
+
+
+# One E record.  job is a dict with at least start and end; the rest
+# defaults to a one-core job of user0 in queue0 that waited no time.
+def accounting_line(job_id,job):
+    start, end = job['start'], job['end']
+    etime = job.get('etime',start)
+    qtime = job.get('qtime',etime)
+    cores = job.get('cores',1)
+    walltime = end - start
+    return "%s;E;%s.%s;user=%s group=%s jobname=test queue=%s ctime=%d qtime=%d etime=%d " \
+           "start=%d owner=%s@login0 exec_host=%s/0-%d Resource_List.nodect=1 " \
+           "Resource_List.nodes=1:ppn=%d Resource_List.walltime=01:00:00 " \
+           "unique_node_count=1 end=%d Exit_status=%d resources_used.cput=%s " \
+           "resources_used.mem=1000kb resources_used.vmem=2000kb " \
+           "resources_used.walltime=%s" % \
+           (time.strftime("%m/%d/%Y %H:%M:%S",time.localtime(end)),job_id,\
+            job.get('server',"clusman0"),job.get('user',"user0"),job.get('group',"group0"),\
+            job.get('queue',"queue0"),qtime,qtime,etime,start,job.get('user',"user0"),\
+            job.get('node',"n1"),cores - 1,cores,end,job.get('exit_status',0),\
+            hms(job.get('cpu',walltime * cores)),hms(walltime))
+
+
+def hms(seconds):
+    return "%02d:%02d:%02d" % (seconds // 3600,seconds // 60 % 60,seconds % 60)
+
+
+# make_table(jobs[, ids]) -> JobTable of the jobs, written to one file.  ids
+# may be numbers or array job IDs such as "1000[2]"
+@pytest.fixture
+def make_table(tmpdir):
+    def make(jobs,ids=None):
+        if ids is None:
+            ids = range(1000,1000 + len(jobs))
+        datafile = tmpdir.join("20150101")
+        datafile.write("".join([accounting_line(job_id,job) + "\n" \
+                                for job_id, job in zip(ids,jobs)]))
+        return read_accounting_file(str(datafile))
+    return make
+
+
+# n random jobs over about a month, from a few users, groups and queues
+def random_jobs(rng,n,start_t=1420070400):
+    jobs = list()
+    for i in range(n):
+        qtime = start_t + int(rng.randint(0,30 * 86400))
+        etime = qtime + int(rng.choice([0,0,0,rng.randint(1,7200)]))
+        start = etime + int(rng.randint(0,20000))
+        jobs.append({'qtime':qtime,'etime':etime,'start':start,\
+                     'end':start + int(rng.randint(1,50000)),'cores':int(rng.choice([1,2,4,16])),\
+                     'user':"user%d" % rng.randint(0,6),'group':"group%d" % rng.randint(0,3),\
+                     'queue':"queue%d" % rng.randint(0,3)})
+    return jobs
@@ -0,0 +1,59 @@
+import numpy as np
+from conftest import random_jobs
+from jobstats.aggregate import WindowIndex
+from jobstats.summary import SummaryStats
+
+
+# The totals of the jobs of one name in [start_t, end_t], job by job
+def window_totals(table,rows,start_t,end_t):
+    columns = table.columns
+    values = dict([(metric,list()) for metric in SummaryStats.metrics])
+    users = dict()
+    for row in rows:
+        if not start_t <= columns['ctime'][row] <= end_t:
+            continue
+        wait = max(int(columns['start'][row] - columns['etime'][row]),0)
+        run = max(int(columns['end'][row] - columns['start'][row]),0)
+        for metric, value in (('wait',wait),('run',run),('turnaround',wait + run),\
+                              ('cores',columns['num_cores'][row]),\
+                              ('nodes',columns['unique_nodes'][row])):
+            values[metric].append(int(value))
+        user = table.names['user'][columns['user'][row]]
+        jobs, cpu = users.get(user,(0,0))
+        users[user] = (jobs + 1,cpu + int(columns['cpu_secs'][row]))
+    return values, users
+
+
+def test_windows_match_brute_force(make_table):
+    rng = np.random.RandomState(7)
+    table = make_table(random_jobs(rng,400))
+    day = 86400
+    # Overlapping windows, one a single second and one with no jobs
+    windows = [("Month",1420070400,1420070400 + 31 * day - 1),\
+               ("Week",1420070400 + 7 * day,1420070400 + 14 * day - 1),\
+               ("Day",1420070400 + 20 * day,1420070400 + 21 * day - 1),\
+               ("Second",int(table.columns['ctime'][0]),int(table.columns['ctime'][0])),\
+               ("Empty",1420070400 - 2 * day,1420070400 - day)]
+    for column in (None,'user','queue'):
+        codes, names = table.grouping(column)
+        # Every other row, so the index skips some of each name's jobs
+        rows = np.arange(0,table.size,2)
+        result = WindowIndex(table,column,rows).stats(windows,('users',))
+        found = dict([((code,w),stats) for code, w, stats in result])
+        expected = set()
+        for code in range(len(names)):
+            for w, (label, start_t, end_t) in enumerate(windows):
+                values, users = window_totals(table,rows[codes[rows] == code],start_t,end_t)
+                if len(values['wait']) == 0:
+                    continue
+                expected.add((code,w))
+                stats = found[(code,w)]
+                assert (stats.owner,stats.label) == (names[code],label)
+                assert stats.num_jobs == len(values['wait'])
+                for metric in SummaryStats.metrics:
+                    assert getattr(stats,metric + '_sum') == sum(values[metric])
+                    assert getattr(stats,metric + '_min') == min(values[metric])
+                    assert getattr(stats,metric + '_max') == max(values[metric])
+                assert dict([(name,(jobs,cpu)) for name, jobs, cpu in stats.users]) == users
+                assert stats.groups == []
+        assert set(found) == expected
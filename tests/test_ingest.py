@@ -0,0 +1,36 @@
+from jobstats.ingest import deduplicate
+
+
+def users_of(table,rows):
+    return sorted([table.names['user'][table.columns['user'][row]] for row in rows])
+
+
+def test_deduplicate_keeps_latest_end(make_table):
+    day = 1420070400
+    jobs = [{'start':day,'end':day + 100,'user':"early"},\
+            {'start':day,'end':day + 500,'user':"latest"},\
+            {'start':day,'end':day + 200,'user':"other"},\
+            {'start':day,'end':day + 500,'user':"tie"},\
+            {'start':day,'end':day + 300,'user':"element1"},\
+            {'start':day,'end':day + 300,'user':"element2"},\
+            {'start':day,'end':day + 50,'user':"requeued1"}]
+    ids = [1000,1000,1001,1000,"1002[1]","1002[2]","1002[1]"]
+    table, index, dropped = deduplicate(make_table(jobs,ids))
+    assert dropped == 3
+    assert len(table) == len(index) == 4
+    # Of the two records ending last, the one read last
+    assert users_of(table,index.lookup("1000")) == ["tie"]
+    assert users_of(table,index.lookup("1001.clusman0")) == ["other"]
+    assert users_of(table,index.lookup("1002")) == ["element1","element2"]
+    assert users_of(table,index.lookup("1002[2]")) == ["element2"]
+    assert len(index.lookup("1000.clusman1")) == 0
+    assert len(index.lookup("999")) == 0
+
+
+def test_deduplicate_without_repeats(make_table):
+    jobs = [{'start':1420070400,'end':1420070500}] * 3
+    table = make_table(jobs)
+    deduplicated, index, dropped = deduplicate(table)
+    assert dropped == 0
+    assert deduplicated is table
+    assert len(index) == 3
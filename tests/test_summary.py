@@ -0,0 +1,78 @@
+import numpy as np
+from conftest import random_jobs
+from jobstats.summary import LogHistogram, SummaryStats
+
+
+# Values spread over every bucket width: small exact ones and a long tail
+def spread_values(rng,n):
+    return np.concatenate((rng.randint(0,300,n // 2),\
+                           np.exp(rng.uniform(0,16,n - n // 2)).astype(np.int64)))
+
+
+# The sketch may be off by half a bucket, at most 1/(2*resolution) of the
+# value, from a value of the right rank
+def check_quantile(sketch,values,q):
+    lower = np.percentile(values,100 * q,interpolation='lower')
+    higher = np.percentile(values,100 * q,interpolation='higher')
+    error = 1.0 / (2 * LogHistogram.resolution)
+    value = sketch.quantile(q)
+    assert lower * (1 - error) <= value <= higher * (1 + error)
+
+
+def test_quantiles_match_numpy():
+    rng = np.random.RandomState(3)
+    values = spread_values(rng,5000)
+    sketch = LogHistogram()
+    for value in values:
+        sketch.add(value)
+    for q in (0.01,0.1,0.25,0.5,0.75,0.9,0.99,1.0):
+        check_quantile(sketch,values,q)
+
+
+def test_small_quantiles_are_exact():
+    rng = np.random.RandomState(4)
+    values = rng.randint(0,2 * LogHistogram.resolution,1000)
+    sketch = LogHistogram()
+    for value in values:
+        sketch.add(value)
+    for q in (0.01,0.5,0.9,0.99,1.0):
+        # Nearest rank, as the sketch counts it
+        assert sketch.quantile(q) == np.sort(values)[max(int(np.ceil(q * len(values))),1) - 1]
+
+
+def test_merged_sketches_match_one_sketch():
+    rng = np.random.RandomState(5)
+    values = spread_values(rng,3000)
+    whole = LogHistogram()
+    first, second = LogHistogram(), LogHistogram()
+    for k, value in enumerate(values):
+        whole.add(value)
+        (first,second)[k % 2].add(value)
+    buckets, counts = np.unique(LogHistogram.bucket(values),return_counts=True)
+    bucketed = LogHistogram(buckets,counts.astype(np.int64))
+    first.merge(second)
+    for q in (0.01,0.5,0.9,0.99,1.0):
+        assert first.quantile(q) == whole.quantile(q) == bucketed.quantile(q)
+    assert LogHistogram().quantile(0.5) is None
+
+
+def test_update_many_matches_update(make_table):
+    rng = np.random.RandomState(6)
+    table = make_table(random_jobs(rng,300))
+    # A window that leaves out the first and last jobs, over some of the rows
+    start_t, end_t = 1420070400 + 5 * 86400, 1420070400 + 25 * 86400
+    rows = np.flatnonzero(rng.randint(0,3,table.size) > 0)
+    one_by_one = SummaryStats("all","window",start_t,end_t,True)
+    for row in rows:
+        one_by_one.update(table[row])
+    at_once = SummaryStats("all","window",start_t,end_t,True)
+    at_once.update_many(table,rows)
+    assert 0 < at_once.num_jobs < len(rows)
+    assert at_once.num_jobs == one_by_one.num_jobs
+    for metric in SummaryStats.metrics:
+        for suffix in ('_sum','_min','_max'):
+            assert getattr(at_once,metric + suffix) == getattr(one_by_one,metric + suffix)
+    for kind in SummaryStats.details:
+        assert getattr(at_once,kind) == getattr(one_by_one,kind)
+    for metric in SummaryStats.percentile_metrics:
+        assert at_once.percentiles(metric) == one_by_one.percentiles(metric)
@@ -0,0 +1,95 @@
+import numpy as np
+from conftest import random_jobs
+from jobstats.usage import Backlog, Utilization, print_backlog
+
+
+# Cores in use at every second of [lo, hi), straight from the jobs
+def cores_in_use(table,rows,lo,hi):
+    columns = table.columns
+    level = np.zeros(hi - lo,dtype=np.int64)
+    for row in rows:
+        first = max(columns['start'][row],lo)
+        last = min(columns['end'][row],hi)
+        if last > first:
+            level[first - lo:last - lo] += columns['num_cores'][row]
+    return level
+
+
+# Jobs waiting, their cores and jobs held at every second of [lo, hi)
+def backlog_levels(table,rows,lo,hi):
+    columns = table.columns
+    levels = dict([(resource,np.zeros(hi - lo,dtype=np.int64)) for resource in Backlog.resources])
+    for row in rows:
+        for resource, first, last, value in \
+                (('held',columns['qtime'][row],columns['etime'][row],1),\
+                 ('jobs',columns['etime'][row],columns['start'][row],1),\
+                 ('cores',columns['etime'][row],columns['start'][row],columns['num_cores'][row])):
+            first, last = max(first,lo), min(last,hi)
+            if last > first:
+                levels[resource][first - lo:last - lo] += value
+    return levels
+
+
+def test_job_in_one_bin(make_table):
+    # One 4-core job running for a tenth of the only bin, after it starts
+    table = make_table([{'start':1420070600,'end':1420070700,'cores':4}])
+    names, averages, peaks = Utilization(table).bins([1420070500,1420071500])
+    assert peaks['cores'][0,0] == 4
+    assert abs(averages['cores'][0,0] - 0.4) < 1e-9
+
+
+def test_bins_match_brute_force(make_table):
+    rng = np.random.RandomState(1)
+    table = make_table(random_jobs(rng,200))
+    edges = np.arange(1420070400,1420070400 + 40 * 86400 + 1,6 * 3600)
+    for column in (None,'queue'):
+        codes, names = table.grouping(column)
+        result_names, averages, peaks = Utilization(table,column).bins(edges)
+        for k, name in enumerate(result_names):
+            rows = np.flatnonzero(codes == names.index(name))
+            level = cores_in_use(table,rows,edges[0],edges[-1])
+            for b in range(len(edges) - 1):
+                inside = level[edges[b] - edges[0]:edges[b + 1] - edges[0]]
+                assert peaks['cores'][k,b] >= averages['cores'][k,b] - 1e-9
+                assert peaks['cores'][k,b] == inside.max()
+                assert abs(averages['cores'][k,b] - inside.mean()) < 1e-6
+
+
+def test_backlog_job_in_first_bin(make_table,capsys):
+    # The only job of queue1 is queued, held and started inside the first bin
+    table = make_table([{'qtime':1420070600,'etime':1420070700,'start':1420070900,\
+                         'end':1420071000,'cores':8,'queue':"queue1"},\
+                        {'start':1420160000,'end':1420170000}])
+    names, averages, peaks = Backlog(table,'queue').bins([1420070500,1420071500,1420072500])
+    k = names.index("queue1")
+    assert (peaks['jobs'][k,0],peaks['cores'][k,0],peaks['held'][k,0]) == (1,8,1)
+    assert abs(averages['cores'][k,0] - 8 * 200 / 1000.0) < 1e-9
+    assert list(peaks['jobs'][k,1:]) == [0]
+    print_backlog(table,[("Day",1420070500,1420156799)],'hour')
+    output = capsys.readouterr()[0]
+    assert "backlog for queue queue1" in output
+    # Peak jobs, peak cores and held in the summary of the window
+    summary = [line.split() for line in output.splitlines() if line.startswith("queue1 ")]
+    assert [(fields[2],fields[-2],fields[-1]) for fields in summary] == [("1","8","1")]
+
+
+def test_backlog_matches_brute_force(make_table):
+    rng = np.random.RandomState(2)
+    table = make_table(random_jobs(rng,200))
+    edges = np.arange(1420070400,1420070400 + 40 * 86400 + 1,6 * 3600)
+    for column in (None,'queue'):
+        codes, names = table.grouping(column)
+        backlog = Backlog(table,column)
+        result_names, averages, peaks = backlog.bins(edges)
+        window_peaks, peak_times = backlog.peaks('jobs',edges[0],edges[-1] - 1)
+        for k, name in enumerate(result_names):
+            rows = np.flatnonzero(codes == names.index(name))
+            levels = backlog_levels(table,rows,edges[0],edges[-1])
+            for resource in Backlog.resources:
+                for b in range(len(edges) - 1):
+                    inside = levels[resource][edges[b] - edges[0]:edges[b + 1] - edges[0]]
+                    assert peaks[resource][k,b] >= averages[resource][k,b] - 1e-9
+                    assert peaks[resource][k,b] == inside.max()
+                    assert abs(averages[resource][k,b] - inside.mean()) < 1e-6
+            assert window_peaks[k] == levels['jobs'].max()
+            assert peak_times[k] == edges[0] + np.argmax(levels['jobs'])